@@ -0,0 +1,109 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def block_windows(width: int, height: int, block_size: int):
+    """
+    Yield (xoff, yoff, xsize, ysize) windows tiling a raster of the given size.
+    """
+    for yoff in range(0, height, block_size):
+        for xoff in range(0, width, block_size):
+            yield (
+                xoff,
+                yoff,
+                min(block_size, width - xoff),
+                min(block_size, height - yoff),
+            )
+
+
+def read_block(band, window, halo=0, nodata=None) -> np.ndarray:
+    """
+    Read a window padded by `halo` pixels on every side as float64.
+    Nodata pixels and pixels falling outside the raster are returned as NaN.
+    """
+    xoff, yoff, xsize, ysize = window
+    width, height = band.XSize, band.YSize
+
+    x0, y0 = max(xoff - halo, 0), max(yoff - halo, 0)
+    x1 = min(xoff + xsize + halo, width)
+    y1 = min(yoff + ysize + halo, height)
+
+    data = band.ReadAsArray(x0, y0, x1 - x0, y1 - y0).astype(np.float64)
+    if nodata is not None:
+        data[data == nodata] = np.nan
+
+    if halo == 0:
+        return data
+
+    out = np.full((ysize + 2 * halo, xsize + 2 * halo), np.nan, dtype=np.float64)
+    oy, ox = y0 - (yoff - halo), x0 - (xoff - halo)
+    out[oy : oy + data.shape[0], ox : ox + data.shape[1]] = data
+    return out
+
+
+def run_blocks(
+    windows,
+    read_fn,
+    compute_fn,
+    write_fn,
+    workers=None,
+    report_timings=False,
+) -> list:
+    """
+    Run `compute_fn` over raster blocks on a thread pool.
+
+    GDAL datasets are not thread safe, so `read_fn(window)` and
+    `write_fn(window, result)` always run on the calling thread while
+    `compute_fn(data)` runs on the pool (kernels should release the GIL,
+    e.g. numba `nogil=True`). Results are written in window order and at most
+    two blocks per worker are held in memory at once.
+
+    Returns a list of (window, read_s, compute_s, write_s) tuples.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = 2 * workers
+    timings = []
+
+    def _timed_compute(data):
+        start = time.perf_counter()
+        result = compute_fn(data)
+        return result, time.perf_counter() - start
+
+    def _drain_one(pending):
+        window, read_s, future = pending.popleft()
+        result, compute_s = future.result()
+        start = time.perf_counter()
+        write_fn(window, result)
+        write_s = time.perf_counter() - start
+        timings.append((window, read_s, compute_s, write_s))
+        if report_timings:
+            xoff, yoff, xsize, ysize = window
+            print(
+                f"[TIMING] block x={xoff} y={yoff} ({xsize}x{ysize}): "
+                f"read {read_s:.3f}s, compute {compute_s:.3f}s, write {write_s:.3f}s"
+            )
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for window in windows:
+            start = time.perf_counter()
+            data = read_fn(window)
+            read_s = time.perf_counter() - start
+            pending.append((window, read_s, pool.submit(_timed_compute, data)))
+            if len(pending) >= max_in_flight:
+                _drain_one(pending)
+        while pending:
+            _drain_one(pending)
+
+    if report_timings and timings:
+        compute_total = sum(t[2] for t in timings)
+        print(
+            f"[TIMING] {len(timings)} blocks on {workers} workers, "
+            f"compute total {compute_total:.3f}s, "
+            f"slowest block {max(t[2] for t in timings):.3f}s"
+        )
+
+    return timings
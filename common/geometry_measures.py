@@ -0,0 +1,179 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import CRS, Geod, Transformer
+
+MEASURE_MODES = ["planar", "geodesic"]
+GEOD = Geod(ellps="WGS84")
+LINE_TYPES = [1, 2, 5]
+POLYGON_TYPES = [3, 6]
+
+
+def to_crs(geoms, src, dst):
+    """Geometry array reprojected from `src` to `dst` in one vectorized pass."""
+    if CRS.from_user_input(src).equals(CRS.from_user_input(dst)):
+        return geoms
+    transformer = Transformer.from_crs(src, dst, always_xy=True)
+    return shapely.transform(
+        geoms, lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1]))
+    )
+
+
+def geodesic_lengths(geoms) -> np.ndarray:
+    """
+    Geodesic length in metres of the lines, or of the ring boundaries for
+    polygons, of lon/lat `geoms`. All segments go through one Geod.inv call.
+    """
+    parts, owner = shapely.get_parts(geoms, return_index=True)
+    polygons = np.isin(shapely.get_type_id(parts), POLYGON_TYPES)
+    rings, ring_part = shapely.get_rings(parts[polygons], return_index=True)
+    lines = np.r_[parts[~polygons], rings]
+    line_owner = np.r_[owner[~polygons], owner[polygons][ring_part]]
+
+    coords, line_idx = shapely.get_coordinates(lines, return_index=True)
+    same = line_idx[1:] == line_idx[:-1]
+    a, b = coords[:-1][same], coords[1:][same]
+    _, _, dist = GEOD.inv(a[:, 0], a[:, 1], b[:, 0], b[:, 1])
+    return np.bincount(
+        line_owner[line_idx[:-1][same]], weights=dist, minlength=len(geoms)
+    )
+
+
+def _authalic_q(sin_lat):
+    e2 = GEOD.es
+    e = np.sqrt(e2)
+    return (1 - e2) * (
+        sin_lat / (1 - e2 * sin_lat**2)
+        - np.log((1 - e * sin_lat) / (1 + e * sin_lat)) / (2 * e)
+    )
+
+
+# Sphere with the area of the WGS84 ellipsoid; authalic latitudes map onto it
+# without distorting area
+AUTHALIC_Q_POLE = _authalic_q(1.0)
+AUTHALIC_R2 = GEOD.a**2 * AUTHALIC_Q_POLE / 2
+
+
+def geodesic_areas(geoms) -> np.ndarray:
+    """
+    Geodesic area in square metres of the polygons in lon/lat `geoms`
+    (0 for other types): exterior rings minus holes, measured on WGS84.
+
+    Vertices are mapped to authalic latitude and every edge's signed
+    spherical excess is taken in one vectorized pass, then summed per ring
+    with np.bincount. This agrees with Geod.polygon_area_perimeter to about
+    1e-6 relative for usual polygons; rings around a pole are not supported.
+    """
+    parts, owner = shapely.get_parts(geoms, return_index=True)
+    polygons = np.isin(shapely.get_type_id(parts), POLYGON_TYPES)
+    rings, ring_part = shapely.get_rings(parts[polygons], return_index=True)
+    exterior = np.r_[True, ring_part[1:] != ring_part[:-1]]
+    coords, ring_idx = shapely.get_coordinates(rings, return_index=True)
+    same = ring_idx[1:] == ring_idx[:-1]
+
+    lon = np.radians(coords[:, 0])
+    q = _authalic_q(np.sin(np.radians(coords[:, 1])))
+    t = np.tan(np.arcsin(np.clip(q / AUTHALIC_Q_POLE, -1, 1)) / 2)
+    # Longitude steps wrap, so rings crossing the antimeridian stay correct
+    dlon = np.remainder(lon[1:] - lon[:-1] + np.pi, 2 * np.pi) - np.pi
+    excess = 2 * np.arctan2(np.tan(dlon / 2) * (t[:-1] + t[1:]), 1 + t[:-1] * t[1:])
+    area = AUTHALIC_R2 * np.abs(
+        np.bincount(ring_idx[:-1][same], weights=excess[same], minlength=len(rings))
+    )
+    return np.bincount(
+        owner[polygons][ring_part],
+        weights=np.where(exterior, area, -area),
+        minlength=len(geoms),
+    )
+
+
+def _measure_chunk(geoms, crs, mode, metric_crs, extra):
+    type_id = shapely.get_type_id(geoms)
+    lines = np.isin(type_id, LINE_TYPES)
+    polygons = np.isin(type_id, POLYGON_TYPES)
+    lonlat = to_crs(geoms, crs, "EPSG:4326")
+
+    if mode == "geodesic":
+        work = lonlat
+        length, area = geodesic_lengths(work), geodesic_areas(work)
+    else:
+        work = to_crs(geoms, crs, metric_crs)
+        length, area = shapely.length(work), shapely.area(work)
+
+    out = {
+        "length_m": np.where(lines, length, np.nan),
+        "area_sq_m": np.where(polygons, area, np.nan),
+        "perimeter_m": np.where(polygons, length, np.nan),
+    }
+    if not extra:
+        return out
+
+    # Centroids are taken in the measuring CRS and reported in lon/lat
+    centroid = shapely.centroid(work)
+    if mode == "planar":
+        centroid = to_crs(centroid, metric_crs, "EPSG:4326")
+    hull = shapely.convex_hull(work)
+    hull_area = geodesic_areas(hull) if mode == "geodesic" else shapely.area(hull)
+    bounds = shapely.bounds(lonlat)
+    # Bounds of a point are its coordinates, and NaN when it is empty
+    centroid = shapely.bounds(centroid)[:, :2]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        compactness = 4 * np.pi * area / length**2
+        hull_ratio = area / hull_area
+    out.update(
+        {
+            "centroid_lon": centroid[:, 0],
+            "centroid_lat": centroid[:, 1],
+            "bbox_minx": bounds[:, 0],
+            "bbox_miny": bounds[:, 1],
+            "bbox_maxx": bounds[:, 2],
+            "bbox_maxy": bounds[:, 3],
+            "vertex_count": shapely.get_num_coordinates(geoms),
+            "compactness": np.where(polygons, compactness, np.nan),
+            "hull_ratio": np.where(polygons, hull_ratio, np.nan),
+        }
+    )
+    return out
+
+
+def geometry_measures(
+    geoms,
+    crs,
+    mode="planar",
+    metric_crs="EPSG:7755",
+    extra=False,
+    workers=1,
+    chunk_size=100000,
+) -> pd.DataFrame:
+    """
+    Length, area and perimeter in metres of every geometry in `geoms` (a
+    GeoSeries or geometry array in `crs`), NaN where a measure does not
+    apply to the geometry type. Planar measures are taken in `metric_crs`,
+    geodesic ones on the WGS84 ellipsoid. With `extra` the same pass adds
+    the lon/lat centroid and bbox, vertex count, compactness (Polsby-Popper,
+    4 pi area / perimeter^2) and the ratio of area to convex hull area.
+
+    Chunks of `chunk_size` geometries run on `workers` processes when above 1.
+    """
+    if mode not in MEASURE_MODES:
+        raise ValueError(f"Unsupported mode: {mode}. Use any of {MEASURE_MODES}.")
+    values = np.asarray(geoms.values if hasattr(geoms, "values") else geoms)
+    crs = CRS.from_user_input(crs).to_wkt()
+    chunks = [values[i : i + chunk_size] for i in range(0, len(values), chunk_size)]
+    args = [(chunk, crs, mode, metric_crs, extra) for chunk in chunks]
+
+    workers = min(workers or os.cpu_count() or 1, max(len(chunks), 1))
+    if workers == 1:
+        results = [_measure_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_measure_chunk, *zip(*args)))
+
+    if not results:
+        return pd.DataFrame(index=getattr(geoms, "index", None))
+    return pd.DataFrame(
+        {key: np.concatenate([r[key] for r in results]) for key in results[0]},
+        index=getattr(geoms, "index", None),
+    )
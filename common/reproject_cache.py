@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+from minio.error import S3Error
+from osgeo import gdal, osr
+
+# Reserved prefix for derived intermediates; nodes should never write here directly
+CACHE_PREFIX = "_gdi_cache/reprojected"
+
+
+def reprojection_cache_key(
+    etag: str,
+    dst_srs: str,
+    resample_alg: str,
+    resolution: float = None,
+    src_nodata: float = None,
+    dst_nodata: float = None,
+) -> str:
+    """
+    Object key of a warped raster derived from the source object with `etag`.
+    """
+    params = {
+        "etag": etag,
+        "dst_srs": dst_srs,
+        "resample_alg": resample_alg,
+        "resolution": resolution,
+        "src_nodata": src_nodata,
+        "dst_nodata": dst_nodata,
+    }
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return f"{CACHE_PREFIX}/{digest}.tif"
+
+
+def _needs_warp(path, dst_srs, resolution, src_nodata, dst_nodata) -> bool:
+    ds = gdal.Open(path)
+    if ds is None:
+        raise FileNotFoundError(f"Cannot open raster: {path}")
+    try:
+        src_srs = osr.SpatialReference(wkt=ds.GetProjection())
+        target_srs = osr.SpatialReference()
+        target_srs.SetFromUserInput(dst_srs)
+        if not src_srs.IsSame(target_srs):
+            return True
+        gt = ds.GetGeoTransform()
+        if resolution is not None and (
+            abs(gt[1]) != float(resolution) or abs(gt[5]) != float(resolution)
+        ):
+            return True
+        if src_nodata is not None or dst_nodata is not None:
+            curr_nodata = ds.GetRasterBand(1).GetNoDataValue()
+            wanted = dst_nodata if dst_nodata is not None else src_nodata
+            if curr_nodata is None or float(curr_nodata) != float(wanted):
+                return True
+        return False
+    finally:
+        ds = None
+
+
+def fetch_reprojected(
+    client,
+    bucket_name: str,
+    artifact_url: str,
+    src_path: str,
+    out_path: str,
+    dst_srs: str = "EPSG:7755",
+    resample_alg: str = "near",
+    resolution: float = None,
+    src_nodata: float = None,
+    dst_nodata: float = None,
+) -> str:
+    """
+    Return a local raster holding `artifact_url` warped to `dst_srs`.
+
+    The warped COG is cached in MinIO under CACHE_PREFIX, keyed by the source
+    object's ETag and the warp parameters, so later calls download it directly
+    (to `out_path`) instead of downloading and re-warping the source. When the
+    source already matches, it is downloaded to `src_path` and returned as is.
+    """
+    etag = client.stat_object(bucket_name, artifact_url).etag
+    cache_key = reprojection_cache_key(
+        etag, dst_srs, resample_alg, resolution, src_nodata, dst_nodata
+    )
+
+    try:
+        client.fget_object(bucket_name, cache_key, out_path)
+        return out_path
+    except S3Error as e:
+        if e.code not in ("NoSuchKey", "NoSuchObject"):
+            print(f"[WARN] Reprojection cache lookup failed ({e.code}); re-warping.")
+
+    client.fget_object(bucket_name, artifact_url, src_path)
+
+    if not _needs_warp(src_path, dst_srs, resolution, src_nodata, dst_nodata):
+        return src_path
+
+    warp_options = gdal.WarpOptions(
+        format="COG",
+        dstSRS=dst_srs,
+        resampleAlg=resample_alg,
+        xRes=resolution,
+        yRes=resolution,
+        srcNodata=src_nodata,
+        dstNodata=dst_nodata,
+    )
+    if gdal.Warp(out_path, src_path, options=warp_options) is None:
+        raise RuntimeError(f"Failed to reproject {artifact_url} to {dst_srs}.")
+
+    # The cache is best effort; a failed upload only costs a re-warp next time
+    try:
+        client.fput_object(bucket_name, cache_key, out_path)
+    except Exception as e:
+        print(f"[WARN] Could not store reprojected raster in cache: {e}")
+
+    if os.path.exists(src_path):
+        os.remove(src_path)
+    return out_path
@@ -0,0 +1,312 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import Transformer
+from scipy.spatial import KDTree
+from scipy.sparse import csr_matrix, triu
+from scipy.sparse.csgraph import dijkstra
+
+
+def build_road_graph(road_gdf, decimals=None, metric_crs=None):
+    """
+    Undirected road graph from the (Multi)LineStrings of `road_gdf`, built
+    with vectorized coordinate arrays. Vertices that coincide (after
+    rounding to `decimals`, when given) become one integer node id and
+    consecutive vertices are joined by an edge weighted with their length,
+    measured in `metric_crs` when given (e.g. for roads in EPSG:4326).
+
+    Returns (graph, node_coords): a symmetric CSR adjacency matrix and the
+    (n_nodes, 2) array of node coordinates in the road layer's CRS.
+    """
+    parts = shapely.get_parts(np.asarray(road_gdf.geometry.values, dtype=object))
+    parts = parts[shapely.get_type_id(parts) == 1]
+    coords, line_idx = shapely.get_coordinates(parts, return_index=True)
+
+    key = coords if decimals is None else np.round(coords, decimals)
+    unique_keys, node_of = np.unique(key[:, 0] + 1j * key[:, 1], return_inverse=True)
+    node_of = node_of.ravel()
+    node_coords = np.column_stack((unique_keys.real, unique_keys.imag))
+
+    # Consecutive vertices of the same line form an edge
+    same_line = line_idx[1:] == line_idx[:-1]
+    src, dst = node_of[:-1][same_line], node_of[1:][same_line]
+
+    if metric_crs is not None and road_gdf.crs is not None:
+        transformer = Transformer.from_crs(road_gdf.crs, metric_crs, always_xy=True)
+        xs, ys = transformer.transform(coords[:, 0], coords[:, 1])
+        coords = np.column_stack((xs, ys))
+    seg = np.diff(coords, axis=0)[same_line]
+    weight = np.hypot(seg[:, 0], seg[:, 1])
+
+    return edges_to_csr(src, dst, weight, len(node_coords)), node_coords
+
+
+def edges_to_csr(src, dst, weight, n_nodes):
+    """
+    Symmetric CSR matrix from an undirected edge list. Self loops are dropped
+    and parallel edges keep their shortest weight (csr_matrix would sum them).
+    """
+    keep = src != dst
+    src, dst, weight = src[keep], dst[keep], weight[keep]
+    lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+    order = np.lexsort((weight, hi, lo))
+    lo, hi, weight = lo[order], hi[order], weight[order]
+    first = np.r_[True, (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])]
+    lo, hi, weight = lo[first], hi[first], weight[first]
+    return csr_matrix(
+        (np.r_[weight, weight], (np.r_[lo, hi], np.r_[hi, lo])),
+        shape=(n_nodes, n_nodes),
+    )
+
+
+def snap_to_edges(graph, node_coords, points_xy, kd_tree=None, eps=1e-9):
+    """
+    Snap points onto their nearest road edge. A point that lands inside an
+    edge gets a virtual node there, wired to the edge's end nodes (and to the
+    other virtual nodes of that edge, in order) with the matching fraction of
+    the edge weight, so routing stays exact without densifying the network.
+    `kd_tree` is a prebuilt KDTree over `node_coords`, built when omitted.
+
+    Returns (graph, node_coords, stop_nodes) for the extended graph.
+    """
+    points_xy = np.asarray(points_xy, dtype=np.float64)
+    n_nodes = graph.shape[0]
+    upper = triu(graph, k=1).tocoo()
+    src, dst, weight = upper.row, upper.col, upper.data
+
+    # Only edges whose bbox can hold a nearest edge need an STRtree entry: the
+    # nearest edge is never farther than the nearest node
+    if kd_tree is None:
+        kd_tree = KDTree(node_coords)
+    node_dist, stop_nodes = kd_tree.query(points_xy)
+    a, b = node_coords[src], node_coords[dst]
+    lo = points_xy.min(axis=0) - node_dist.max()
+    hi = points_xy.max(axis=0) + node_dist.max()
+    near = np.all((np.maximum(a, b) >= lo) & (np.minimum(a, b) <= hi), axis=1)
+    src, dst, weight = src[near], dst[near], weight[near]
+    if len(src) == 0:
+        return graph, node_coords, stop_nodes
+    segments = shapely.linestrings(
+        np.stack((node_coords[src], node_coords[dst]), axis=1)
+    )
+    points = shapely.points(points_xy)
+    pt_idx, seg_idx = shapely.STRtree(segments).query_nearest(points, all_matches=False)
+    edge = np.empty(len(points_xy), dtype=np.int64)
+    edge[pt_idx] = seg_idx
+    frac = shapely.line_locate_point(segments[edge], points, normalized=True)
+
+    # Ends of an edge are existing nodes; interior positions become virtual
+    stop_nodes = np.where(frac <= 0.5, src[edge], dst[edge])
+    inside = (frac > eps) & (frac < 1 - eps)
+    if not inside.any():
+        return graph, node_coords, stop_nodes
+    (virt_edge, virt_frac), virt_of = np.unique(
+        np.stack((edge[inside], frac[inside])), axis=1, return_inverse=True
+    )
+    virt_edge = virt_edge.astype(np.int64)
+    n_virtual = len(virt_edge)
+    virt_ids = n_nodes + np.arange(n_virtual)
+    stop_nodes[inside] = virt_ids[virt_of.ravel()]
+
+    # np.unique sorts by edge then fraction: chain src - v1 - ... - vk - dst
+    first = np.r_[True, virt_edge[1:] != virt_edge[:-1]]
+    last = np.r_[virt_edge[1:] != virt_edge[:-1], True]
+    prev_node = np.where(first, src[virt_edge], np.r_[-1, virt_ids[:-1]])
+    prev_frac = np.where(first, 0.0, np.r_[0.0, virt_frac[:-1]])
+    new_src = np.r_[prev_node, virt_ids[last]]
+    new_dst = np.r_[virt_ids, dst[virt_edge[last]]]
+    new_w = (
+        weight[np.r_[virt_edge, virt_edge[last]]]
+        * np.r_[virt_frac - prev_frac, 1.0 - virt_frac[last]]
+    )
+
+    size = n_nodes + n_virtual
+    indptr = np.r_[graph.indptr, np.full(n_virtual, graph.indptr[-1])]
+    padded = csr_matrix((graph.data, graph.indices, indptr), shape=(size, size))
+    extra = csr_matrix(
+        (np.r_[new_w, new_w], (np.r_[new_src, new_dst], np.r_[new_dst, new_src])),
+        shape=(size, size),
+    )
+    virt_xy = shapely.get_coordinates(
+        shapely.line_interpolate_point(segments[virt_edge], virt_frac, normalized=True)
+    )
+    return padded + extra, np.vstack((node_coords, virt_xy)), stop_nodes
+
+
+def stop_distance_matrix(graph, stop_nodes, chunk_size=32) -> np.ndarray:
+    """
+    Shortest network distance between every pair of `stop_nodes` (inf when
+    unreachable), from one Dijkstra search per distinct stop node. The graph
+    is symmetric, so searches run in directed mode, which spares scipy from
+    building a transposed copy of the whole graph on every call.
+    """
+    stop_nodes = np.asarray(stop_nodes, dtype=np.int64)
+    unique_nodes, inverse = np.unique(stop_nodes, return_inverse=True)
+    matrix = np.empty((len(unique_nodes), len(unique_nodes)), dtype=np.float64)
+    for start in range(0, len(unique_nodes), chunk_size):
+        sources = unique_nodes[start : start + chunk_size]
+        dist = dijkstra(graph, directed=True, indices=sources)
+        matrix[start : start + len(sources)] = dist[:, unique_nodes]
+    return matrix[np.ix_(inverse, inverse)]
+
+
+def shortest_path(graph, source, target, distance=None) -> list:
+    """
+    Node ids of the shortest path from `source` to `target`. When the path
+    length is already known the search stops once it is reached.
+    """
+    if source == target:
+        return [int(source)]
+    limit = np.inf if distance is None else distance * (1 + 1e-9) + 1e-9
+    _, predecessors = dijkstra(
+        graph,
+        directed=True,
+        indices=int(source),
+        return_predecessors=True,
+        limit=limit,
+    )
+    if predecessors[target] < 0:
+        return []
+    path = [int(target)]
+    while path[-1] != source:
+        path.append(int(predecessors[path[-1]]))
+    return path[::-1]
+
+
+# Per-process inputs of run_source_chunks tasks (graph, targets, ...)
+worker_state = {}
+# Bytes of dense Dijkstra output (sources x all nodes) one search may hold
+SEARCH_BYTES = 64 * 1024 * 1024
+
+
+def _init_worker(state):
+    worker_state.update(state)
+
+
+def source_chunks(nodes, chunk_size=64) -> list:
+    """
+    Split source positions into (positions, nodes) chunks, sorted by node so
+    sources sharing a node land in the same chunk and share one search.
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    order = np.argsort(nodes, kind="stable")
+    return [
+        (order[i : i + chunk_size], nodes[order[i : i + chunk_size]])
+        for i in range(0, len(order), chunk_size)
+    ]
+
+
+def run_source_chunks(task, chunks, state, workers=None):
+    """
+    Yield task(*chunk) for every chunk, in order. Tasks run on a process pool
+    whose workers receive `state` once (read it from worker_state), with at
+    most two chunks per worker in flight so memory stays flat.
+    """
+    workers = min(workers or os.cpu_count() or 1, max(len(chunks), 1))
+    if workers == 1:
+        _init_worker(state)
+        try:
+            for chunk in chunks:
+                yield task(*chunk)
+        finally:
+            worker_state.clear()
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(state,)
+    ) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(task, *chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _od_chunk(origin_pos, origin_nodes):
+    """
+    Reachable (origin, destination, distance) triples for one chunk. Sources
+    are searched in batches small enough that the dense output of a search
+    stays within SEARCH_BYTES, and only the destination columns are kept.
+    """
+    graph, dest_nodes = worker_state["graph"], worker_state["dest_nodes"]
+    sources, inverse = np.unique(origin_nodes, return_inverse=True)
+    batch = max(1, SEARCH_BYTES // (8 * graph.shape[0]))
+    to_dest = np.empty((len(sources), len(dest_nodes)), dtype=np.float64)
+    for start in range(0, len(sources), batch):
+        to_dest[start : start + batch] = dijkstra(
+            graph,
+            directed=True,
+            indices=sources[start : start + batch],
+            limit=worker_state["cutoff"],
+        )[:, dest_nodes]
+    dist = to_dest[inverse.ravel()]
+    rows, cols = np.nonzero(np.isfinite(dist))
+    return origin_pos[rows], cols, dist[rows, cols]
+
+
+def _od_csv_chunk(origin_pos, origin_nodes):
+    """One chunk as CSV lines, formatted in the worker rather than the parent."""
+    o, d, dist = _od_chunk(origin_pos, origin_nodes)
+    origin_ids, dest_ids = worker_state["labels"]
+    return pd.DataFrame(
+        {"origin_id": origin_ids[o], "destination_id": dest_ids[d], "distance": dist}
+    ).to_csv(header=False, index=False, float_format="%.3f")
+
+
+def _run_od(task, graph, origin_nodes, dest_nodes, cutoff, workers, chunk_size, labels):
+    state = {
+        "graph": graph,
+        "dest_nodes": np.asarray(dest_nodes, dtype=np.int64),
+        "cutoff": np.inf if cutoff is None else float(cutoff),
+        "labels": labels,
+    }
+    chunks = source_chunks(origin_nodes, chunk_size)
+    yield from run_source_chunks(task, chunks, state, workers)
+
+
+def od_distances(
+    graph, origin_nodes, dest_nodes, cutoff=None, workers=None, chunk_size=64
+):
+    """
+    Network distances from every origin node to every destination node,
+    yielded per chunk of origins as (origin_index, destination_index,
+    distance) arrays. Searches stop at `cutoff`, so only destinations within
+    it (and reachable at all) are reported. Chunks run on a process pool;
+    origins sharing a node share one search.
+    """
+    yield from _run_od(
+        _od_chunk, graph, origin_nodes, dest_nodes, cutoff, workers, chunk_size, None
+    )
+
+
+def od_csv_chunks(
+    graph,
+    origin_nodes,
+    dest_nodes,
+    origin_ids,
+    dest_ids,
+    cutoff=None,
+    workers=None,
+    chunk_size=64,
+):
+    """
+    Same as od_distances, but each chunk is yielded as long-format CSV lines
+    (origin_id, destination_id, distance) built by the workers, so writing a
+    large matrix is not bound by formatting in the parent process.
+    """
+    labels = (np.asarray(origin_ids), np.asarray(dest_ids))
+    yield from _run_od(
+        _od_csv_chunk,
+        graph,
+        origin_nodes,
+        dest_nodes,
+        cutoff,
+        workers,
+        chunk_size,
+        labels,
+    )
@@ -0,0 +1,153 @@
+import time
+import numpy as np
+
+ROUTE_MODES = ["cycle", "open"]
+# Improvements smaller than this are treated as float noise
+EPS = 1e-9
+
+
+def path_length(path, dist) -> float:
+    """Total length of visiting `path` in order on the distance matrix."""
+    path = np.asarray(path)
+    return float(dist[path[:-1], path[1:]].sum())
+
+
+def nearest_neighbour_path(dist, first, last) -> np.ndarray:
+    """
+    Path from `first` to `last` that always moves on to the closest stop not
+    visited yet. `first` may equal `last` (a closed tour).
+    """
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    visited[[first, last]] = True
+    path = [first]
+    for _ in range(n - visited.sum()):
+        row = np.where(visited, np.inf, dist[path[-1]])
+        nxt = int(np.argmin(row))
+        visited[nxt] = True
+        path.append(nxt)
+    path.append(last)
+    return np.asarray(path, dtype=np.int64)
+
+
+def two_opt(path, dist, deadline) -> bool:
+    """
+    One sweep of 2-opt over the interior of `path` (the end points stay put),
+    reversing a segment whenever that shortens the path. For each segment
+    start all segment ends are scored at once. Returns True if it improved.
+    """
+    improved = False
+    m = len(path)
+    for i in range(1, m - 2):
+        if time.perf_counter() > deadline:
+            break
+        j = np.arange(i + 1, m - 1)
+        a, b = path[i - 1], path[i]
+        c, d = path[j], path[j + 1]
+        delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+        k = int(np.argmin(delta))
+        if delta[k] < -EPS:
+            path[i : j[k] + 1] = path[i : j[k] + 1][::-1].copy()
+            improved = True
+    return improved
+
+
+def or_opt(path, dist, deadline, max_segment=3) -> bool:
+    """
+    One sweep of Or-opt: move segments of up to `max_segment` stops, possibly
+    reversed, to the best other position in the path. All insertion points
+    are scored at once. Returns True if it improved.
+    """
+    improved = False
+    for seg_len in range(1, max_segment + 1):
+        i = 1
+        while i + seg_len <= len(path) - 1:
+            if time.perf_counter() > deadline:
+                return improved
+            m = len(path)
+            s0, s1 = path[i], path[i + seg_len - 1]
+            prev, nxt = path[i - 1], path[i + seg_len]
+            gain = dist[prev, s0] + dist[s1, nxt] - dist[prev, nxt]
+
+            # Edges (k, k+1) that do not touch the segment
+            k = np.r_[np.arange(0, i - 1), np.arange(i + seg_len, m - 1)]
+            if len(k) == 0:
+                break
+            u, v = path[k], path[k + 1]
+            forward = dist[u, s0] + dist[s1, v]
+            backward = dist[u, s1] + dist[s0, v]
+            cost = np.minimum(forward, backward) - dist[u, v]
+            best = int(np.argmin(cost))
+            if cost[best] - gain < -EPS:
+                segment = path[i : i + seg_len].copy()
+                if backward[best] < forward[best]:
+                    segment = segment[::-1]
+                rest = np.r_[path[:i], path[i + seg_len :]]
+                at = k[best] + 1 if k[best] < i else k[best] + 1 - seg_len
+                path[:] = np.r_[rest[:at], segment, rest[at:]]
+                improved = True
+            else:
+                i += 1
+    return improved
+
+
+def optimize_route(dist, mode="cycle", start=None, end=None, time_budget=10.0) -> tuple:
+    """
+    Order the stops of the square distance matrix `dist` into a short tour.
+
+    A nearest-neighbour seed is improved with alternating 2-opt and Or-opt
+    sweeps until neither helps or `time_budget` seconds have passed. In cycle
+    mode the tour returns to `start` (stop 0 by default); in open mode it is
+    a path that begins at `start` and ends at `end` when those are given.
+    Free path ends are handled with a dummy stop at distance 0 from all.
+
+    Returns (order, history): the stop indices in visiting order (a cycle
+    repeats its first stop at the end) and a list of (seconds, step,
+    length) entries, one per improving step.
+    """
+    if mode not in ROUTE_MODES:
+        raise ValueError(f"Unsupported route mode: {mode}. Use any of {ROUTE_MODES}.")
+    dist = np.asarray(dist, dtype=np.float64)
+    n = len(dist)
+    for stop in (start, end):
+        if stop is not None and not 0 <= stop < n:
+            raise ValueError(f"Stop index {stop} is out of range for {n} stops.")
+    if not np.isfinite(dist).all():
+        unreachable = np.unique(np.nonzero(~np.isfinite(dist))[0]).tolist()
+        raise ValueError(
+            f"Stops {unreachable} cannot be reached from every other stop; "
+            "the road network is disconnected."
+        )
+    if mode == "cycle" and end is not None and end != start:
+        raise ValueError("A cycle ends where it starts; leave end unset.")
+
+    if mode == "cycle":
+        first = last = 0 if start is None else start
+        work = dist
+    elif start is not None and end is not None:
+        first, last = start, end
+        work = dist
+    else:
+        # Dummy stop n closes free ends at no cost
+        work = np.zeros((n + 1, n + 1), dtype=np.float64)
+        work[:n, :n] = dist
+        first = n if start is None else start
+        last = n if end is None else end
+
+    began = time.perf_counter()
+    deadline = began + float(time_budget)
+    path = nearest_neighbour_path(work, first, last)
+    history = [(time.perf_counter() - began, "seed", path_length(path, work))]
+    while time.perf_counter() < deadline:
+        improved = False
+        for step, sweep in (("2-opt", two_opt), ("or-opt", or_opt)):
+            if sweep(path, work, deadline):
+                improved = True
+                history.append(
+                    (time.perf_counter() - began, step, path_length(path, work))
+                )
+        if not improved:
+            break
+
+    order = path[(path != n)] if mode == "open" else path
+    return [int(s) for s in order], history
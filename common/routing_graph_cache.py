@@ -0,0 +1,229 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import geopandas as gpd
+from minio.error import S3Error
+from scipy.sparse import csr_matrix
+from scipy.spatial import KDTree
+
+from common.road_graph import build_road_graph
+
+# Reserved prefix for derived intermediates; nodes should never write here directly
+CACHE_PREFIX = "_gdi_cache/routing_graph"
+# Bump when the on-disk layout changes so stale artifacts are rebuilt
+GRAPH_FORMAT = 2
+# meta.json goes last: a directory is only complete once it exists
+GRAPH_FILES = [
+    "indptr.npy",
+    "indices.npy",
+    "data.npy",
+    "node_coords.npy",
+    "meta.json",
+]
+
+
+class LazyKDTree:
+    """
+    KDTree over `coords`, built on the first query, so loading a graph costs
+    no more than mapping its arrays and runs that never snap skip the build.
+    """
+
+    def __init__(self, coords):
+        self.coords = coords
+        self._tree = None
+
+    def query(self, *args, **kwargs):
+        if self._tree is None:
+            # The sliding midpoint rule builds about twice as fast as the
+            # balanced default and answers nearest node queries as well
+            self._tree = KDTree(self.coords, balanced_tree=False, compact_nodes=False)
+        return self._tree.query(*args, **kwargs)
+
+
+def routing_graph_key(etag: str, decimals: int = None, metric_crs: str = None) -> str:
+    """
+    Object prefix of the routing graph built from the road object with `etag`.
+    """
+    params = {
+        "etag": etag,
+        "decimals": decimals,
+        "metric_crs": metric_crs,
+        "format": GRAPH_FORMAT,
+    }
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return f"{CACHE_PREFIX}/{digest}"
+
+
+def local_cache_dir() -> str:
+    """Local directory holding downloaded routing graphs (GDI_CACHE_DIR)."""
+    root = os.environ.get(
+        "GDI_CACHE_DIR", os.path.join(tempfile.gettempdir(), "gdi_cache")
+    )
+    return os.path.join(root, "routing_graph")
+
+
+def write_routing_graph(directory, graph, node_coords, crs) -> None:
+    """
+    Serialize a road graph as raw .npy arrays (CSR indptr/indices/data and node
+    coordinates) and a small meta.json. An
+    edge's geometry is the segment between its two node coordinates, so the
+    CSR arrays double as the edge to geometry mapping.
+    """
+    os.makedirs(directory, exist_ok=True)
+    graph = graph.tocsr()
+    # scipy keeps int32 indices whenever they fit and would copy wider ones
+    # on load, so store them in the dtype it uses
+    index_dtype = np.int32 if max(graph.nnz, graph.shape[0]) < 2**31 else np.int64
+    np.save(os.path.join(directory, "indptr.npy"), graph.indptr.astype(index_dtype))
+    np.save(os.path.join(directory, "indices.npy"), graph.indices.astype(index_dtype))
+    np.save(os.path.join(directory, "data.npy"), graph.data)
+    np.save(os.path.join(directory, "node_coords.npy"), node_coords)
+    meta = {
+        "format": GRAPH_FORMAT,
+        "crs": crs.to_wkt() if hasattr(crs, "to_wkt") else str(crs),
+        "n_nodes": int(graph.shape[0]),
+        "n_edges": int(graph.nnz // 2),
+    }
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def read_routing_graph(directory):
+    """
+    Load a graph written by write_routing_graph. Arrays are memory mapped and
+    used in place by the CSR matrix, so only the pages a search touches are
+    read from disk. The KD-tree over the nodes is not stored (no pickled
+    object from the shared bucket is ever loaded); it is built from
+    node_coords on its first query.
+
+    Returns (graph, node_coords, kd_tree, crs).
+    """
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        for name in ("indptr", "indices", "data", "node_coords")
+    }
+    n_nodes = meta["n_nodes"]
+    graph = csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=(n_nodes, n_nodes),
+        copy=False,
+    )
+    kd_tree = LazyKDTree(arrays["node_coords"])
+    return graph, arrays["node_coords"], kd_tree, meta["crs"]
+
+
+def _read_roads(client, bucket_name, artifact_url):
+    with client.get_object(
+        bucket_name=bucket_name, object_name=artifact_url
+    ) as response:
+        road_gdf = gpd.read_file(io.BytesIO(response.read()))
+
+    # Explode multi-line geometries and remove empties
+    road_gdf = road_gdf.explode(ignore_index=True)
+    road_gdf = road_gdf[road_gdf.geometry.notna()]
+    if road_gdf.empty:
+        raise ValueError("[ERROR] Road GeoDataFrame is empty after filtering/explode.")
+
+    # If no CRS on road_gdf, assume EPSG:4326
+    if road_gdf.crs is None:
+        road_gdf.set_crs("EPSG:4326", inplace=True)
+    return road_gdf
+
+
+def read_locations(client, bucket_name, artifact_url, road_crs, id_field=None):
+    """
+    Point coordinates (in `road_crs`) and ids of the features stored at
+    `artifact_url`, for snapping onto the routing graph. Ids come from
+    `id_field`, or the row index when it is not given.
+    """
+    with client.get_object(bucket_name, artifact_url) as response:
+        gdf = gpd.read_file(io.BytesIO(response.read()))
+    gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+    if gdf.empty:
+        raise ValueError(f"No valid geometries found in '{artifact_url}'.")
+    if id_field and id_field not in gdf.columns:
+        raise ValueError(f"Field '{id_field}' not found in '{artifact_url}'.")
+    if gdf.crs is None:
+        gdf = gdf.set_crs("EPSG:4326")
+    gdf = gdf.to_crs(road_crs)
+
+    # Polygons (e.g. wards) are represented by a point inside them
+    points = gdf.geometry.where(
+        gdf.geom_type == "Point", gdf.geometry.representative_point()
+    )
+    ids = gdf[id_field].to_numpy() if id_field else gdf.index.to_numpy()
+    return np.column_stack((points.x, points.y)), ids
+
+
+def load_routing_graph(
+    client,
+    bucket_name: str,
+    artifact_url: str,
+    decimals: int = None,
+    metric_crs: str = None,
+    cache_dir: str = None,
+):
+    """
+    Return the routing graph of the road layer `artifact_url`, building it
+    only when no prebuilt copy exists.
+
+    Graphs are cached in MinIO under CACHE_PREFIX, keyed by the road object's
+    ETag and the build parameters, and mirrored in a local cache directory so
+    repeated runs on one machine skip the download as well.
+
+    Returns (graph, node_coords, kd_tree, crs, cache_key).
+    """
+    etag = client.stat_object(bucket_name, artifact_url).etag
+    cache_key = routing_graph_key(etag, decimals, metric_crs)
+    cache_root = cache_dir or local_cache_dir()
+    local_dir = os.path.join(cache_root, os.path.basename(cache_key))
+    if os.path.exists(os.path.join(local_dir, "meta.json")):
+        return read_routing_graph(local_dir) + (cache_key,)
+
+    # Fill a scratch directory and move it into place once complete, so a
+    # failed or concurrent run never leaves a half written graph behind
+    os.makedirs(cache_root, exist_ok=True)
+    scratch = tempfile.mkdtemp(dir=cache_root)
+    try:
+        try:
+            for name in GRAPH_FILES:
+                client.fget_object(
+                    bucket_name, f"{cache_key}/{name}", os.path.join(scratch, name)
+                )
+        except S3Error as e:
+            if e.code not in ("NoSuchKey", "NoSuchObject"):
+                print(
+                    f"[WARN] Routing graph cache lookup failed ({e.code}); rebuilding."
+                )
+            road_gdf = _read_roads(client, bucket_name, artifact_url)
+            graph, node_coords = build_road_graph(
+                road_gdf, decimals=decimals, metric_crs=metric_crs
+            )
+            if len(node_coords) == 0:
+                raise ValueError("[ERROR] The road graph has no nodes. Cannot proceed.")
+            write_routing_graph(scratch, graph, node_coords, road_gdf.crs)
+
+            # The cache is best effort; a failed upload only costs a rebuild next time
+            try:
+                for name in GRAPH_FILES:
+                    client.fput_object(
+                        bucket_name, f"{cache_key}/{name}", os.path.join(scratch, name)
+                    )
+            except Exception as e:
+                print(f"[WARN] Could not store routing graph in cache: {e}")
+
+        try:
+            os.rename(scratch, local_dir)
+        except OSError:
+            # Another run already populated the local cache
+            shutil.rmtree(scratch, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+    return read_routing_graph(local_dir) + (cache_key,)
@@ -11,7 +11,7 @@ def save_csv_artifact(
     config: str, local_path: str, file_path: str, store_artifact: str
 ):
     """
-    Save CSV file to MinIO or local.
+    Save CSV file to MinIO or local and return the path it was saved under.
     """
 
     if not file_path:
@@ -42,3 +42,5 @@ def save_csv_artifact(
 
     else:
         raise ValueError("Invalid store_artifact. Use either 'minio' or 'local'.")
+
+    return file_path
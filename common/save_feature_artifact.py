@@ -3,6 +3,7 @@ import uuid
 import warnings
 import geopandas as gpd
 from common.minio_ops import connect_store_minio
+from common.vector_io import vector_driver
 
 warnings.filterwarnings("ignore")
 
@@ -10,7 +11,8 @@ warnings.filterwarnings("ignore")
 def reproject_with_ogr(input_path, output_path, target_epsg="4326"):
     """
     Reproject a GeoJSON file (replacement for ogr2ogr using GeoPandas).
-    Keeps the same function name and parameters for compatibility.
+    Keeps the same function name and parameters for compatibility. The
+    output format follows the extension of output_path (e.g. .fgb).
     """
     try:
         gdf = gpd.read_file(input_path)
@@ -23,7 +25,7 @@ def reproject_with_ogr(input_path, output_path, target_epsg="4326"):
         gdf = gdf.to_crs(f"EPSG:{target_epsg}")
 
         # Save output
-        gdf.to_file(output_path, driver="GeoJSON")
+        gdf.to_file(output_path, driver=vector_driver(output_path))
 
     except Exception as e:
         raise RuntimeError(f"[ERROR] Reprojection failed: {e}")
@@ -31,11 +33,17 @@ def reproject_with_ogr(input_path, output_path, target_epsg="4326"):
 
 def save_feature(gdf, file_path, config_path, store_artifact):
     """
-    Save a GeoDataFrame after ensuring it is projected to EPSG:4326.
+    Save a GeoDataFrame after ensuring it is projected to EPSG:4326. A
+    file_path ending in .fgb is stored as FlatGeobuf with a spatial index,
+    which lets later nodes read just the features in a bbox; any other
+    file_path is stored as GeoJSON.
     """
 
+    if not file_path:
+        file_path = f"{uuid.uuid4()}.geojson"
+    driver = vector_driver(file_path)
     temp_input = "temp_input.geojson"
-    temp_output = "temp_output.geojson"
+    temp_output = "temp_output.fgb" if driver == "FlatGeobuf" else "temp_output.geojson"
 
     try:
         # Step 1: Save input temporarily
@@ -47,11 +55,7 @@ def save_feature(gdf, file_path, config_path, store_artifact):
         # Step 3: Read reprojected file
         reprojected_gdf = gpd.read_file(temp_output)
 
-        # Step 4: Determine output name
-        if not file_path:
-            file_path = f"{uuid.uuid4()}.geojson"
-
-        # Step 5: Save artifact
+        # Step 4: Save artifact
         if store_artifact.lower() == "minio":
             connect_store_minio(config_path, temp_output, file_path)
         elif store_artifact.lower() == "local":
@@ -63,7 +67,7 @@ def save_feature(gdf, file_path, config_path, store_artifact):
             else:
                 save_path = os.path.join(os.getcwd(), file_path)
 
-            reprojected_gdf.to_file(save_path, driver="GeoJSON")
+            reprojected_gdf.to_file(save_path, driver=driver)
 
             print(f"[INFO] Data saved locally to {save_path}")
 
@@ -76,7 +80,7 @@ def save_feature(gdf, file_path, config_path, store_artifact):
         raise Exception(f"[ERROR] save_feature failed: {e}")
 
     finally:
-        # Step 6: Cleanup
+        # Step 5: Cleanup
         if os.path.exists(temp_input):
             os.remove(temp_input)
 
@@ -0,0 +1,185 @@
+import numpy as np
+import shapely
+from scipy.sparse.csgraph import dijkstra
+
+from common.road_graph import (
+    SEARCH_BYTES,
+    worker_state,
+    source_chunks,
+    run_source_chunks,
+)
+
+POLYGON_METHODS = ["buffer", "concave_hull"]
+
+
+def parse_thresholds(spec) -> np.ndarray:
+    """Sorted distinct thresholds from a comma separated string like "500,1000"."""
+    try:
+        values = [float(v) for v in str(spec).split(",") if v.strip()]
+    except ValueError:
+        raise ValueError(f"Invalid thresholds: '{spec}'. Use e.g. 500,1000,2000.")
+    if not values or min(values) <= 0:
+        raise ValueError(f"Thresholds must be positive numbers, got '{spec}'.")
+    return np.unique(values)
+
+
+def reached_edges(graph, node_dist):
+    """
+    Edges (src, dst, weight) with at least one endpoint reached, i.e. with a
+    finite `node_dist`. Only the CSR rows of reached nodes are visited, so the
+    cost follows the size of the service area rather than of the network.
+    """
+    reached = np.flatnonzero(np.isfinite(node_dist))
+    start, stop = graph.indptr[reached], graph.indptr[reached + 1]
+    counts = stop - start
+    offsets = np.repeat(start - np.cumsum(counts) + counts, counts)
+    pos = offsets + np.arange(counts.sum())
+    src = np.repeat(reached, counts)
+    dst = np.asarray(graph.indices[pos], dtype=np.int64)
+    weight = np.asarray(graph.data[pos], dtype=np.float64)
+    # Edges between two reached nodes are listed from both ends; keep one
+    keep = (src < dst) | ~np.isfinite(node_dist[dst])
+    return src[keep], dst[keep], weight[keep]
+
+
+def reachable_pieces(du, dv, weight, threshold):
+    """
+    Parts of edges reachable within `threshold`, as (edge, start, end)
+    fractions along each edge measured from its src end. An edge reached from
+    both ends is covered fully once the two reaches meet.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ru = np.clip((threshold - du) / weight, 0.0, 1.0)
+        rv = np.clip((threshold - dv) / weight, 0.0, 1.0)
+    ru, rv = np.nan_to_num(ru), np.nan_to_num(rv)
+    full = ru + rv >= 1.0
+    from_u = ~full & (ru > 0)
+    from_v = ~full & (rv > 0)
+    edge = np.r_[np.flatnonzero(full), np.flatnonzero(from_u), np.flatnonzero(from_v)]
+    start = np.r_[np.zeros(full.sum()), np.zeros(from_u.sum()), 1.0 - rv[from_v]]
+    end = np.r_[np.ones(full.sum()), ru[from_u], np.ones(from_v.sum())]
+    return edge, start, end
+
+
+def service_area_geometries(
+    node_dist,
+    graph,
+    node_coords,
+    thresholds,
+    method="buffer",
+    buffer_distance=50.0,
+    concave_ratio=0.3,
+):
+    """
+    Reachable road network and service area polygon for every threshold,
+    from the network distances `node_dist` of one (multi-source) search.
+
+    Returns a list of (threshold, MultiLineString, Polygon) tuples.
+    """
+    src, dst, weight = reached_edges(graph, node_dist)
+    du, dv = node_dist[src], node_dist[dst]
+    a, b = node_coords[src], node_coords[dst]
+
+    results = []
+    for threshold in thresholds:
+        edge, start, end = reachable_pieces(du, dv, weight, threshold)
+        if len(edge) == 0:
+            results.append((threshold, None, None))
+            continue
+        vec = b[edge] - a[edge]
+        p0 = a[edge] + start[:, None] * vec
+        p1 = a[edge] + end[:, None] * vec
+        lines = shapely.multilinestrings(shapely.linestrings(np.stack((p0, p1), 1)))
+        if method == "buffer":
+            polygon = shapely.buffer(lines, buffer_distance)
+        elif method == "concave_hull":
+            points = shapely.multipoints(np.vstack((p0, p1)))
+            polygon = shapely.concave_hull(points, ratio=concave_ratio)
+        else:
+            raise ValueError(
+                f"Unsupported polygon method: {method}. Use any of {POLYGON_METHODS}."
+            )
+        results.append((threshold, lines, polygon))
+    return results
+
+
+def _service_area_chunk(positions, nodes):
+    """
+    Service areas of one chunk of facilities, one search per facility node.
+    Sources are searched in batches whose dense distance rows stay within
+    SEARCH_BYTES, and each row becomes areas before the next batch runs.
+    """
+    graph, thresholds = worker_state["graph"], worker_state["thresholds"]
+    sources, inverse = np.unique(nodes, return_inverse=True)
+    batch = max(1, SEARCH_BYTES // (8 * graph.shape[0]))
+    per_node = []
+    for start in range(0, len(sources), batch):
+        dist = dijkstra(
+            graph,
+            directed=True,
+            indices=sources[start : start + batch],
+            limit=thresholds.max(),
+        )
+        per_node.extend(
+            service_area_geometries(
+                row,
+                graph,
+                worker_state["node_coords"],
+                thresholds,
+                **worker_state["polygon_options"],
+            )
+            for row in dist
+        )
+        del dist
+    return [
+        (int(pos), *area)
+        for pos, node in zip(positions, inverse.ravel())
+        for area in per_node[node]
+    ]
+
+
+def service_areas(
+    graph,
+    node_coords,
+    facility_nodes,
+    thresholds,
+    per_facility=True,
+    workers=None,
+    chunk_size=16,
+    **polygon_options,
+):
+    """
+    Service areas around `facility_nodes` for all `thresholds` at once.
+
+    With per_facility each facility gets one bounded Dijkstra search (run in
+    chunks on a process pool) whose distances serve every threshold.
+    Otherwise a single multi-source search yields the combined area reached
+    from the nearest facility.
+
+    Yields (facility_index, threshold, MultiLineString, Polygon) tuples;
+    facility_index is None for combined areas.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    if not per_facility:
+        node_dist = dijkstra(
+            graph,
+            directed=True,
+            indices=np.unique(facility_nodes),
+            limit=thresholds.max(),
+            min_only=True,
+        )
+        for area in service_area_geometries(
+            node_dist, graph, node_coords, thresholds, **polygon_options
+        ):
+            yield (None, *area)
+        return
+
+    state = {
+        "graph": graph,
+        "node_coords": node_coords,
+        "thresholds": thresholds,
+        "polygon_options": polygon_options,
+    }
+    chunks = source_chunks(facility_nodes, chunk_size)
+    for chunk_result in run_source_chunks(_service_area_chunk, chunks, state, workers):
+        yield from chunk_result
@@ -0,0 +1,65 @@
+import io
+import os
+import geopandas as gpd
+import shapely
+
+# Vector artifact formats by file extension; FlatGeobuf carries a packed
+# Hilbert R-tree, so a bbox read only fetches the matching features
+VECTOR_DRIVERS = {
+    ".geojson": "GeoJSON",
+    ".json": "GeoJSON",
+    ".fgb": "FlatGeobuf",
+}
+
+
+def vector_driver(path: str) -> str:
+    """OGR driver for the extension of `path`, GeoJSON when it is not known."""
+    return VECTOR_DRIVERS.get(os.path.splitext(str(path))[1].lower(), "GeoJSON")
+
+
+def companion_path(file_path: str, suffix: str) -> str:
+    """Path next to `file_path` with `suffix` before its extension."""
+    root, ext = os.path.splitext(file_path)
+    return f"{root}{suffix}{ext or '.geojson'}"
+
+
+def _bbox_filter(bbox):
+    # A frame stands for its total bounds, with its CRS so that geopandas can
+    # reproject the filter to the data's CRS
+    if isinstance(bbox, (gpd.GeoDataFrame, gpd.GeoSeries)):
+        if bbox.empty:
+            return None
+        return gpd.GeoSeries([shapely.box(*bbox.total_bounds)], crs=bbox.crs)
+    return tuple(bbox)
+
+
+def read_vector(client, bucket_name, object_name, bbox=None) -> gpd.GeoDataFrame:
+    """
+    Read the vector artifact `object_name` from MinIO, restricted to the
+    features whose bbox meets `bbox` when given (a (minx, miny, maxx, maxy)
+    tuple in the artifact's CRS, or a GeoDataFrame/GeoSeries whose bounds
+    are used in its own CRS).
+
+    FlatGeobuf artifacts are read in place through a presigned URL, so GDAL
+    fetches only the header, the spatial index and the matching features
+    with HTTP range requests. Other formats are downloaded and filtered
+    while parsing. Rows keep their position in the artifact as index.
+    """
+    bbox = None if bbox is None else _bbox_filter(bbox)
+    if bbox is None:
+        with client.get_object(bucket_name, object_name) as response:
+            return gpd.read_file(io.BytesIO(response.read()))
+
+    if vector_driver(object_name) == "FlatGeobuf":
+        # Skip the directory listing GDAL would otherwise request first
+        os.environ.setdefault("GDAL_DISABLE_READDIR_ON_OPEN", "EMPTY_DIR")
+        url = client.presigned_get_object(bucket_name, object_name)
+        try:
+            gdf = gpd.read_file(f"/vsicurl/{url}", bbox=bbox, fid_as_index=True)
+            return gdf.rename_axis(None)
+        except Exception as e:
+            print(f"[WARN] Range read of '{object_name}' failed ({e}); downloading.")
+
+    with client.get_object(bucket_name, object_name) as response:
+        gdf = gpd.read_file(io.BytesIO(response.read()), bbox=bbox, fid_as_index=True)
+    return gdf.rename_axis(None)
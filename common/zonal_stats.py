@@ -0,0 +1,693 @@
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+import numba
+import shapely
+from osgeo import gdal, ogr, osr
+from common.block_engine import block_windows
+
+REDUCERS = [
+    "mean",
+    "min",
+    "max",
+    "count",
+    "sum",
+    "std",
+    "median",
+    "majority",
+    "histogram",
+]
+COVERAGE_MODES = ["binary", "fractional"]
+# Pixel values held in memory at once for median, percentiles and majority;
+# the rest wait in spill files on disk
+ORDER_STAT_PIXELS = 50_000_000
+# Spill files per band, each holding a contiguous range of feature labels
+SPILL_FILES = 64
+
+
+def parse_reducers(spec) -> list:
+    """
+    Split a comma separated reducer list such as "mean,std,p90" and validate
+    every entry. Percentiles are written as pNN with 0 <= NN <= 100.
+    """
+    names = spec.split(",") if isinstance(spec, str) else list(spec)
+    reducers = []
+    for name in (n.strip().lower() for n in names):
+        if not name or name in reducers:
+            continue
+        if name not in REDUCERS and _percentile(name) is None:
+            raise ValueError(
+                f"Unsupported reducer: {name}. Use any of {REDUCERS} or pNN percentiles."
+            )
+        reducers.append(name)
+    if not reducers:
+        raise ValueError("At least one reducer is required.")
+    return reducers
+
+
+def _percentile(name):
+    """Quantile in [0, 1] for a pNN reducer name, None for anything else."""
+    if not name.startswith("p"):
+        return None
+    try:
+        q = float(name[1:])
+    except ValueError:
+        return None
+    return q / 100.0 if 0.0 <= q <= 100.0 else None
+
+
+def overlap_passes(geometries) -> list:
+    """
+    Split feature indices into groups whose members have disjoint interiors,
+    so each group can be burnt into a single label raster without losing
+    pixels shared by overlapping features. Non-overlapping layers (the usual
+    case for admin boundaries) yield a single group.
+    """
+    geoms = np.asarray(geometries, dtype=object)
+    n = len(geoms)
+    tree = shapely.STRtree(geoms)
+    left, right = tree.query(geoms, predicate="intersects")
+    keep = left < right
+    left, right = left[keep], right[keep]
+    if left.size:
+        interiors = shapely.relate_pattern(geoms[left], geoms[right], "T********")
+        left, right = left[interiors], right[interiors]
+    if left.size == 0:
+        return [np.arange(n)]
+
+    neighbours = [[] for _ in range(n)]
+    for i, j in zip(left.tolist(), right.tolist()):
+        neighbours[i].append(j)
+        neighbours[j].append(i)
+
+    # Greedy colouring of the overlap graph
+    colour = np.full(n, -1, dtype=np.int64)
+    for i in range(n):
+        used = {colour[j] for j in neighbours[i] if colour[j] >= 0}
+        c = 0
+        while c in used:
+            c += 1
+        colour[i] = c
+    return [np.flatnonzero(colour == c) for c in range(colour.max() + 1)]
+
+
+def rasterize_zones(raster_ds, geometries, indices, out_path) -> str:
+    """
+    Burn 1-based feature ids of `geometries[indices]` into an Int32 raster
+    aligned with `raster_ds` (0 = no feature). Uses GDAL's default
+    pixel-centre rule.
+    """
+    srs = osr.SpatialReference()
+    srs.ImportFromWkt(raster_ds.GetProjection())
+
+    mem_ds = ogr.GetDriverByName("Memory").CreateDataSource("zones")
+    layer = mem_ds.CreateLayer("zones", srs=srs, geom_type=ogr.wkbUnknown)
+    layer.CreateField(ogr.FieldDefn("zid", ogr.OFTInteger))
+    feature_def = layer.GetLayerDefn()
+    for idx in indices:
+        geom = geometries[idx]
+        if geom is None or geom.is_empty:
+            continue
+        feature = ogr.Feature(feature_def)
+        feature.SetField("zid", int(idx) + 1)
+        feature.SetGeometry(ogr.CreateGeometryFromWkb(geom.wkb))
+        layer.CreateFeature(feature)
+        feature = None
+
+    label_ds = gdal.GetDriverByName("GTiff").Create(
+        out_path,
+        raster_ds.RasterXSize,
+        raster_ds.RasterYSize,
+        1,
+        gdal.GDT_Int32,
+        options=["TILED=YES", "BIGTIFF=IF_SAFER", "COMPRESS=LZW"],
+    )
+    label_ds.SetGeoTransform(raster_ds.GetGeoTransform())
+    label_ds.SetProjection(raster_ds.GetProjection())
+    gdal.RasterizeLayer(label_ds, [1], layer, options=["ATTRIBUTE=zid"])
+    label_ds.FlushCache()
+    label_ds, layer, mem_ds = None, None, None
+    return out_path
+
+
+@numba.njit(cache=True, nogil=True)
+def _draw_edge(acc, x0, y0, x1, y1, sign):
+    # Signed-area accumulation of one edge (font-rs style); a running sum
+    # along each row of `acc` then yields the exact covered fraction
+    if y0 == y1:
+        return
+    if y0 < y1:
+        d0 = sign
+    else:
+        d0 = -sign
+        x0, y0, x1, y1 = x1, y1, x0, y0
+    dxdy = (x1 - x0) / (y1 - y0)
+    x = x0
+    for y in range(int(np.floor(y0)), min(acc.shape[0], int(np.ceil(y1)))):
+        dy = min(y + 1.0, y1) - max(float(y), y0)
+        xnext = x + dxdy * dy
+        d = dy * d0
+        xa, xb = (x, xnext) if x < xnext else (xnext, x)
+        xa_floor = np.floor(xa)
+        xai = int(xa_floor)
+        xb_ceil = np.ceil(xb)
+        xbi = int(xb_ceil)
+        if xbi <= xai + 1:
+            xmf = 0.5 * (x + xnext) - xa_floor
+            acc[y, xai] += d - d * xmf
+            acc[y, xai + 1] += d * xmf
+        else:
+            s = 1.0 / (xb - xa)
+            xaf = xa - xa_floor
+            a0 = 0.5 * s * (1.0 - xaf) * (1.0 - xaf)
+            xbf = xb - xb_ceil + 1.0
+            am = 0.5 * s * xbf * xbf
+            acc[y, xai] += d * a0
+            if xbi == xai + 2:
+                acc[y, xai + 1] += d * (1.0 - a0 - am)
+            else:
+                a1 = s * (1.5 - xaf)
+                acc[y, xai + 1] += d * (a1 - a0)
+                for xi in range(xai + 2, xbi - 1):
+                    acc[y, xi] += d * s
+                a2 = a1 + (xbi - xai - 3) * s
+                acc[y, xbi - 1] += d * (1.0 - a2 - am)
+            acc[y, xbi] += d * am
+        x = xnext
+
+
+@numba.njit(cache=True, nogil=True)
+def _coverage_fractions(
+    coords, ring_offsets, ring_exterior, feature_rings, windows, out_offsets, width
+):
+    # Exact coverage of every pixel in each feature's window; returns flat
+    # block pixel index, local feature index and covered fraction
+    n_out = out_offsets[-1]
+    pixels = np.empty(n_out, dtype=np.int64)
+    owners = np.empty(n_out, dtype=np.int64)
+    weights = np.zeros(n_out, dtype=np.float64)
+    for f in range(windows.shape[0]):
+        c0, r0, c1, r1 = windows[f, 0], windows[f, 1], windows[f, 2], windows[f, 3]
+        w, h = c1 - c0, r1 - r0
+        acc = np.zeros((h, w + 2), dtype=np.float64)
+        for r in range(feature_rings[f], feature_rings[f + 1]):
+            start, stop = ring_offsets[r], ring_offsets[r + 1]
+            area = 0.0
+            for k in range(start, stop - 1):
+                area += (
+                    coords[k, 0] * coords[k + 1, 1] - coords[k + 1, 0] * coords[k, 1]
+                )
+            if area == 0.0:
+                continue
+            # Shells and holes must wind in opposite directions
+            sign = 1.0 if (area > 0.0) == ring_exterior[r] else -1.0
+            for k in range(start, stop - 1):
+                _draw_edge(
+                    acc,
+                    min(max(coords[k, 0] - c0, 0.0), float(w)),
+                    min(max(coords[k, 1] - r0, 0.0), float(h)),
+                    min(max(coords[k + 1, 0] - c0, 0.0), float(w)),
+                    min(max(coords[k + 1, 1] - r0, 0.0), float(h)),
+                    sign,
+                )
+        pos = out_offsets[f]
+        for y in range(h):
+            cover = 0.0
+            for x in range(w):
+                cover += acc[y, x]
+                pixels[pos] = (r0 + y) * width + c0 + x
+                owners[pos] = f
+                weights[pos] = min(abs(cover), 1.0)
+                pos += 1
+    return pixels, owners, weights
+
+
+def coverage_block(geometries, window, geotransform):
+    """
+    Exact fractional coverage of the pixels of a raster block by polygons
+    (north-up geotransform). Returns (flat pixel index in the block,
+    geometry index, covered fraction) for every partly covered pixel.
+    """
+    xoff, yoff, xsize, ysize = window
+    gt = geotransform
+    xs = gt[0] + xoff * gt[1], gt[0] + (xoff + xsize) * gt[1]
+    ys = gt[3] + yoff * gt[5], gt[3] + (yoff + ysize) * gt[5]
+    clipped = shapely.clip_by_rect(
+        np.asarray(geometries, dtype=object), min(xs), min(ys), max(xs), max(ys)
+    )
+
+    parts, part_geom = shapely.get_parts(clipped, return_index=True)
+    polygons = shapely.get_type_id(parts) == 3
+    parts, part_geom = parts[polygons], part_geom[polygons]
+    if parts.size == 0:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+
+    rings, ring_part = shapely.get_rings(parts, return_index=True)
+    ring_exterior = np.r_[True, ring_part[1:] != ring_part[:-1]]
+    coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+    coords = np.column_stack(
+        ((coords[:, 0] - gt[0]) / gt[1] - xoff, (coords[:, 1] - gt[3]) / gt[5] - yoff)
+    )
+    ring_offsets = np.r_[0, np.cumsum(np.bincount(coord_ring, minlength=len(rings)))]
+    geoms, first_ring = np.unique(part_geom[ring_part], return_index=True)
+    feature_rings = np.r_[first_ring, len(rings)]
+
+    # Pixel window of every feature from its coordinate extent
+    first_coord = ring_offsets[first_ring]
+    lo = np.floor(np.minimum.reduceat(coords, first_coord, axis=0)).astype(np.int64)
+    hi = np.ceil(np.maximum.reduceat(coords, first_coord, axis=0)).astype(np.int64)
+    windows = np.column_stack(
+        (
+            np.clip(lo[:, 0], 0, xsize),
+            np.clip(lo[:, 1], 0, ysize),
+            np.clip(hi[:, 0], 0, xsize),
+            np.clip(hi[:, 1], 0, ysize),
+        )
+    )
+    windows[:, 2] = np.maximum(windows[:, 2], windows[:, 0])
+    windows[:, 3] = np.maximum(windows[:, 3], windows[:, 1])
+    sizes = (windows[:, 2] - windows[:, 0]) * (windows[:, 3] - windows[:, 1])
+    out_offsets = np.r_[0, np.cumsum(sizes)]
+
+    pixels, owners, weights = _coverage_fractions(
+        coords, ring_offsets, ring_exterior, feature_rings, windows, out_offsets, xsize
+    )
+    keep = weights > 1e-12
+    return pixels[keep], geoms[owners[keep]], weights[keep]
+
+
+def _binary_zone_blocks(raster_ds, geometries, valid_idx, block_size, tmp_dir):
+    """Yield (window, pixels, labels, None) from rasterized feature ids."""
+    passes = overlap_passes(geometries[valid_idx]) if valid_idx.size else []
+    for pass_no, members in enumerate(passes):
+        label_path = os.path.join(tmp_dir, f"zones_{pass_no}.tif")
+        rasterize_zones(raster_ds, geometries, valid_idx[members], label_path)
+        label_ds = gdal.Open(label_path)
+        label_band = label_ds.GetRasterBand(1)
+        try:
+            for window in block_windows(
+                raster_ds.RasterXSize, raster_ds.RasterYSize, block_size
+            ):
+                labels = label_band.ReadAsArray(*window).ravel()
+                pixels = np.flatnonzero(labels > 0)
+                if pixels.size:
+                    yield window, pixels, labels[pixels], None
+        finally:
+            label_band, label_ds = None, None
+            os.remove(label_path)
+
+
+def _fractional_zone_blocks(raster_ds, geometries, valid_idx, block_size):
+    """Yield (window, pixels, labels, coverage) from exact polygon coverage."""
+    gt = raster_ds.GetGeoTransform()
+    if gt[2] != 0 or gt[4] != 0:
+        raise ValueError("Fractional coverage requires a north-up raster.")
+    if valid_idx.size == 0:
+        return
+    tree = shapely.STRtree(geometries[valid_idx])
+    for window in block_windows(
+        raster_ds.RasterXSize, raster_ds.RasterYSize, block_size
+    ):
+        xoff, yoff, xsize, ysize = window
+        xs = gt[0] + xoff * gt[1], gt[0] + (xoff + xsize) * gt[1]
+        ys = gt[3] + yoff * gt[5], gt[3] + (yoff + ysize) * gt[5]
+        candidates = valid_idx[
+            tree.query(shapely.box(min(xs), min(ys), max(xs), max(ys)))
+        ]
+        if candidates.size == 0:
+            continue
+        pixels, owners, coverage = coverage_block(geometries[candidates], window, gt)
+        if pixels.size:
+            yield window, pixels, candidates[owners] + 1, coverage
+
+
+def _segment_reduce(ufunc, labels, values, acc):
+    """Fold per-label ufunc reductions of a block into `acc` using one sort."""
+    if labels.size == 0:
+        return
+    order = np.argsort(labels, kind="stable")
+    labels, values = labels[order], values[order]
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ids = labels[starts]
+    acc[ids] = ufunc(acc[ids], ufunc.reduceat(values, starts))
+
+
+def _merge_moments(acc, labels, values, weights, size):
+    """Merge weighted block count, mean and M2 per label into `acc` (Chan et al.)."""
+    n_b = np.bincount(labels, weights=weights, minlength=size)
+    wv = values if weights is None else values * weights
+    sum_b = np.bincount(labels, weights=wv, minlength=size)
+    mean_b = sum_b / np.where(n_b > 0, n_b, 1.0)
+    sq = (values - mean_b[labels]) ** 2
+    m2_b = np.bincount(
+        labels, weights=sq if weights is None else sq * weights, minlength=size
+    )
+
+    n_a = acc["count"]
+    n_ab = n_a + n_b
+    ratio = n_b / np.where(n_ab > 0, n_ab, 1.0)
+    delta = mean_b - acc["mean"]
+    acc["m2"] += m2_b + delta * delta * n_a * ratio
+    acc["mean"] += delta * ratio
+    acc["total"] += sum_b
+    acc["count"] = n_ab
+
+
+def _order_statistics(labels, values, weights, size, quantiles, majority):
+    """
+    Percentiles and majority per label from the (label, value) pairs of every
+    pixel, using a single sort. Unweighted percentiles follow numpy's
+    "linear" rule; weighted ones return the smallest value whose cumulative
+    weight reaches the quantile.
+    """
+    # Sort by (label, value) through one int64 key, much faster than lexsort
+    rank = np.empty(values.size, dtype=np.int64)
+    rank[np.argsort(values)] = np.arange(values.size)
+    order = np.argsort(labels.astype(np.int64) * values.size + rank)
+    labels, values = labels[order], values[order]
+    counts = np.bincount(labels, minlength=size)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has = counts > 0
+    if weights is not None:
+        weights = weights[order]
+        cumulative = np.cumsum(weights)
+        before = np.r_[0.0, cumulative][starts]
+        total = np.bincount(labels, weights=weights, minlength=size)
+
+    out = {}
+    for name, q in quantiles.items():
+        result = np.full(size, np.nan)
+        if weights is None:
+            pos = starts[has] + q * (counts[has] - 1)
+            lo, hi = np.floor(pos).astype(np.int64), np.ceil(pos).astype(np.int64)
+            result[has] = values[lo] + (values[hi] - values[lo]) * (pos - lo)
+        else:
+            idx = np.searchsorted(cumulative, before[has] + q * total[has])
+            idx = np.clip(idx, starts[has], starts[has] + counts[has] - 1)
+            result[has] = values[idx]
+        out[name] = result
+
+    if majority:
+        result = np.full(size, np.nan)
+        if labels.size:
+            new_run = np.r_[
+                True, (labels[1:] != labels[:-1]) | (values[1:] != values[:-1])
+            ]
+            run_starts = np.flatnonzero(new_run)
+            if weights is None:
+                run_weight = np.diff(np.r_[run_starts, labels.size])
+            else:
+                run_weight = np.add.reduceat(weights, run_starts)
+            run_label, run_value = labels[run_starts], values[run_starts]
+            # Heaviest run per label, ties resolved towards the smallest value
+            best = np.lexsort((run_value, -run_weight, run_label))
+            first = np.r_[True, run_label[best][1:] != run_label[best][:-1]]
+            result[run_label[best][first]] = run_value[best][first]
+        out["majority"] = result
+    return out
+
+
+def _spill_dtype(weighted):
+    fields = [("label", np.int32), ("value", np.float64)]
+    return np.dtype(fields + [("weight", np.float64)] if weighted else fields)
+
+
+def _spill_pairs(files, labels, values, weights, size):
+    """
+    Append the (label, value[, weight]) pairs of one block to the spill file
+    of their label range, so each file later holds a disjoint set of zones.
+    """
+    bucket = labels.astype(np.int64) * len(files) // size
+    order = np.argsort(bucket, kind="stable")
+    bounds = np.searchsorted(bucket[order], np.arange(len(files) + 1))
+    records = np.empty(labels.size, dtype=_spill_dtype(weights is not None))
+    records["label"], records["value"] = labels, values
+    if weights is not None:
+        records["weight"] = weights
+    records = records[order]
+    for k, f in enumerate(files):
+        if bounds[k + 1] > bounds[k]:
+            records[bounds[k] : bounds[k + 1]].tofile(f)
+
+
+def _spilled_order_statistics(
+    paths, weighted, pair_counts, size, quantiles, majority, max_pixels
+):
+    """
+    _order_statistics over pairs spilled by _spill_pairs. Zones are handled a
+    group at a time, a group holding about `max_pixels` pairs (a whole spill
+    file when it is small enough), so memory stays bounded by the budget
+    rather than by the raster. A single zone above the budget is rejected.
+    """
+    too_big = np.flatnonzero(pair_counts > max_pixels)
+    if too_big.size:
+        raise ValueError(
+            f"Feature {too_big[0] - 1} covers {pair_counts[too_big[0]]} pixels, more "
+            f"than the {max_pixels} that median, percentiles and majority can hold "
+            "in memory. Use mean, min, max or histogram, or a coarser raster."
+        )
+    out = {name: np.full(size, np.nan) for name in quantiles}
+    if majority:
+        out["majority"] = np.full(size, np.nan)
+    dtype = _spill_dtype(weighted)
+    bucket_of = np.arange(size) * len(paths) // size
+
+    for k, path in enumerate(paths):
+        if os.path.getsize(path) == 0:
+            continue
+        records = np.memmap(path, dtype=dtype, mode="r")
+        zones = np.flatnonzero((bucket_of == k) & (pair_counts > 0))
+        group = (np.cumsum(pair_counts[zones]) - 1) // max_pixels
+        for g in np.unique(group):
+            members = zones[group == g]
+            if g == group[0] and g == group[-1]:
+                chunk = np.array(records)
+            else:
+                # Collect the group's pairs with a bounded scan of the file
+                lo, hi = members[0], members[-1]
+                parts = []
+                for start in range(0, len(records), max_pixels):
+                    block = records[start : start + max_pixels]
+                    keep = (block["label"] >= lo) & (block["label"] <= hi)
+                    parts.append(np.array(block[keep]))
+                chunk = np.concatenate(parts)
+            ordered = _order_statistics(
+                chunk["label"],
+                chunk["value"],
+                chunk["weight"] if weighted else None,
+                size,
+                quantiles,
+                majority,
+            )
+            for name, result in ordered.items():
+                out[name][members] = result[members]
+        del records
+    return out
+
+
+def zonal_statistics(
+    raster_path,
+    geometries,
+    reducers,
+    bands=(1,),
+    block_size=1024,
+    tmp_dir=None,
+    histogram_bins=10,
+    coverage_mode="binary",
+    order_stat_pixels=ORDER_STAT_PIXELS,
+) -> dict:
+    """
+    Reduce raster values under each geometry (in raster CRS) in one pass.
+
+    With coverage_mode "binary", feature ids are rasterized once per overlap
+    group (pixel-centre rule) and the label raster is read block by block.
+    With "fractional", the exact fraction of every pixel covered by each
+    polygon is computed per block in compiled code and used as a pixel
+    weight, so count becomes the covered area in pixels, sum is area
+    weighted and small polygons get accurate values without resampling.
+
+    Running sums, moments and extremes are aggregated with np.bincount and
+    sorted-segment reductions. For median, percentiles and majority the
+    (label, value) pairs are spilled to files by label range during the
+    pass and then sorted one group of zones at a time, so memory is bounded
+    by `order_stat_pixels` pairs rather than by the raster size; a single
+    feature covering more pixels than that raises ValueError. Histograms use
+    `histogram_bins` equal-width bins between the band minimum and maximum
+    and are returned as JSON lists of (weighted) counts.
+
+    Returns {(band, reducer): array with one entry per geometry}. Features
+    covering no pixel get NaN (None for histograms).
+    """
+    reducers = parse_reducers(reducers)
+    if coverage_mode not in COVERAGE_MODES:
+        raise ValueError(
+            f"Unsupported coverage mode: {coverage_mode}. Use one of {COVERAGE_MODES}."
+        )
+    quantiles = {}
+    for r in reducers:
+        q = 0.5 if r == "median" else _percentile(r)
+        if q is not None:
+            quantiles[r] = q
+    collect_values = bool(quantiles) or "majority" in reducers
+    weighted = coverage_mode == "fractional"
+    histogram_bins = int(histogram_bins)
+    order_stat_pixels = int(order_stat_pixels)
+
+    geometries = np.asarray(geometries, dtype=object)
+    n = len(geometries)
+    size = n + 1
+    raster_ds = gdal.Open(raster_path)
+    if raster_ds is None:
+        raise FileNotFoundError(f"Cannot open raster: {raster_path}")
+    bands = [int(b) for b in bands]
+    for b in bands:
+        if not 1 <= b <= raster_ds.RasterCount:
+            raise ValueError(
+                f"Band {b} out of range; raster has {raster_ds.RasterCount} band(s)."
+            )
+    tmp_dir = tmp_dir or os.path.dirname(os.path.abspath(raster_path))
+    spill_dir = tempfile.mkdtemp(dir=tmp_dir) if collect_values else None
+
+    # Slot 0 collects pixels outside every feature and is dropped at the end
+    n_pixels = np.zeros(size, dtype=np.int64)
+    accs = []
+    for b in bands:
+        band = raster_ds.GetRasterBand(b)
+        acc = {
+            "band": band,
+            "nodata": band.GetNoDataValue(),
+            "count": np.zeros(size, dtype=np.float64),
+            "total": np.zeros(size, dtype=np.float64),
+            "mean": np.zeros(size, dtype=np.float64),
+            "m2": np.zeros(size, dtype=np.float64),
+            "min": np.full(size, np.inf),
+            "max": np.full(size, -np.inf),
+            "pairs": np.zeros(size, dtype=np.int64),
+            "spill_paths": [],
+            "spill_files": [],
+        }
+        if "histogram" in reducers:
+            try:
+                lo, hi = band.ComputeRasterMinMax(False)
+            except RuntimeError:
+                lo, hi = 0.0, 1.0
+            acc["edges"] = np.linspace(lo, hi, histogram_bins + 1)
+            acc["hist"] = np.zeros((size, histogram_bins), dtype=np.float64)
+        accs.append(acc)
+
+    valid_idx = np.flatnonzero(
+        [g is not None and not g.is_empty for g in geometries]
+    ).astype(np.int64)
+    if coverage_mode == "binary":
+        zone_blocks = _binary_zone_blocks(
+            raster_ds, geometries, valid_idx, block_size, tmp_dir
+        )
+    else:
+        zone_blocks = _fractional_zone_blocks(
+            raster_ds, geometries, valid_idx, block_size
+        )
+
+    try:
+        if collect_values:
+            for b, acc in zip(bands, accs):
+                acc["spill_paths"] = [
+                    os.path.join(spill_dir, f"band{b}_{k}.bin")
+                    for k in range(SPILL_FILES)
+                ]
+                acc["spill_files"] = [open(p, "wb") for p in acc["spill_paths"]]
+
+        for window, pixels, block_labels, block_weights in zone_blocks:
+            n_pixels += np.bincount(block_labels, minlength=size)
+
+            for acc in accs:
+                values = acc["band"].ReadAsArray(*window).ravel()
+                values = values[pixels].astype(np.float64)
+                if acc["nodata"] is not None:
+                    values[values == acc["nodata"]] = np.nan
+                valid = ~np.isnan(values)
+                labels, values = block_labels[valid], values[valid]
+                weights = None if block_weights is None else block_weights[valid]
+
+                _merge_moments(acc, labels, values, weights, size)
+                if "min" in reducers:
+                    _segment_reduce(np.minimum, labels, values, acc["min"])
+                if "max" in reducers:
+                    _segment_reduce(np.maximum, labels, values, acc["max"])
+                if "histogram" in reducers:
+                    bins = np.searchsorted(acc["edges"], values, side="right") - 1
+                    bins = np.clip(bins, 0, histogram_bins - 1)
+                    acc["hist"] += np.bincount(
+                        labels * histogram_bins + bins,
+                        weights=weights,
+                        minlength=size * histogram_bins,
+                    ).reshape(size, histogram_bins)
+                if collect_values:
+                    # Pixels outside every feature are not needed for ranking
+                    inside = labels > 0
+                    labels, values = labels[inside], values[inside]
+                    weights = None if weights is None else weights[inside]
+                    acc["pairs"] += np.bincount(labels, minlength=size)
+                    _spill_pairs(acc["spill_files"], labels, values, weights, size)
+
+        for acc in accs:
+            for f in acc["spill_files"]:
+                f.close()
+
+        results = {}
+        covered = n_pixels[1:] > 0
+        for b, acc in zip(bands, accs):
+            count = acc["count"]
+            has = count > 0
+            ordered = {}
+            if collect_values:
+                ordered = _spilled_order_statistics(
+                    acc["spill_paths"],
+                    weighted,
+                    acc["pairs"],
+                    size,
+                    quantiles,
+                    "majority" in reducers,
+                    order_stat_pixels,
+                )
+
+            for r in reducers:
+                if r == "histogram":
+                    hist = acc["hist"][1:]
+                    if coverage_mode == "binary":
+                        rows = hist.astype(np.int64).tolist()
+                    else:
+                        rows = np.round(hist, 6).tolist()
+                    results[(b, r)] = np.array(
+                        [json.dumps(h) if c else None for h, c in zip(rows, covered)],
+                        dtype=object,
+                    )
+                    continue
+                if r == "mean":
+                    result = np.where(has, acc["mean"], np.nan)
+                elif r == "std":
+                    result = np.where(
+                        has,
+                        np.sqrt(np.maximum(acc["m2"], 0.0) / np.where(has, count, 1.0)),
+                        np.nan,
+                    )
+                elif r in ("min", "max"):
+                    result = np.where(has, acc[r], np.nan)
+                elif r == "sum":
+                    result = acc["total"].copy()
+                elif r == "count":
+                    result = count.copy()
+                else:
+                    result = ordered[r]
+                # Features that cover no pixel at all stay NaN for every reducer
+                results[(b, r)] = np.where(covered, result[1:], np.nan)
+    finally:
+        for acc in accs:
+            for f in acc["spill_files"]:
+                f.close()
+            acc["band"] = None
+        if spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+        raster_ds = None
+    return results
@@ -1,10 +1,11 @@
 import os
 import subprocess
 import warnings
-from osgeo import gdal, osr
+from osgeo import gdal
 from common.minio_ops import connect_minio, get_bucket_name
 from common.convert_to_cog import tiff_to_cogtiff
 from common.save_raster_artifact import save_raster_artifact
+from common.reproject_cache import fetch_reprojected
 
 warnings.filterwarnings("ignore")
 
@@ -33,26 +34,16 @@ def compute_slope(
     temp_slope_raw = "temp_slope_raw.tif"
     temp_slope_cog = "temp_slope_cog.tif"
 
-    # Download DEM
-    with client.get_object(bucket_name, artifact_url) as response:
-        dem_data = response.read()
-    with open(temp_dem, "wb") as f:
-        f.write(dem_data)
-
-    dem_for_slope = temp_dem
-
-    # Check and reproject CRS if needed
-    src_ds = gdal.Open(temp_dem)
-    src_srs = osr.SpatialReference()
-    src_srs.ImportFromWkt(src_ds.GetProjection())
-    target_srs = osr.SpatialReference()
-    target_srs.ImportFromEPSG(7755)
-
-    if not src_srs.IsSame(target_srs):
-        warp_options = gdal.WarpOptions(dstSRS="EPSG:7755", resampleAlg="bilinear")
-        gdal.Warp(temp_dem_7755, src_ds, options=warp_options)
-        dem_for_slope = temp_dem_7755
-    src_ds = None
+    # Download DEM, reusing a cached EPSG:7755 warp of this object when available
+    dem_for_slope = fetch_reprojected(
+        client,
+        bucket_name,
+        artifact_url,
+        temp_dem,
+        temp_dem_7755,
+        dst_srs="EPSG:7755",
+        resample_alg="bilinear",
+    )
 
     # Ensure NoData=0
     ds = gdal.Open(dem_for_slope)
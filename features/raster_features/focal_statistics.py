@@ -0,0 +1,313 @@
+import os
+import tempfile
+import warnings
+import numpy as np
+import numba
+from osgeo import gdal
+from common.minio_ops import connect_minio, get_bucket_name
+from common.convert_to_cog import tiff_to_cogtiff
+from common.save_raster_artifact import save_raster_artifact
+from common.block_engine import block_windows, read_block, run_blocks
+
+warnings.filterwarnings("ignore")
+
+NODATA = -9999.0
+STATISTICS = ["mean", "std", "sum", "count", "min", "max", "range", "majority"]
+KERNEL_SHAPES = ["square", "circle", "annulus"]
+
+
+def build_footprint(kernel_shape, radius, inner_radius=0) -> np.ndarray:
+    """
+    Boolean (2r+1, 2r+1) neighbourhood mask for the given kernel shape.
+    """
+    if radius < 1:
+        raise ValueError("Kernel radius must be at least 1 pixel.")
+    yy, xx = np.mgrid[-radius : radius + 1, -radius : radius + 1]
+    dist2 = xx * xx + yy * yy
+    if kernel_shape == "square":
+        return np.ones_like(dist2, dtype=bool)
+    if kernel_shape == "circle":
+        return dist2 <= radius * radius
+    if kernel_shape == "annulus":
+        if not 0 <= inner_radius < radius:
+            raise ValueError("Annulus inner radius must be in [0, radius).")
+        return (dist2 > inner_radius * inner_radius) & (dist2 <= radius * radius)
+    raise ValueError(
+        f"Unsupported kernel shape: {kernel_shape}. Use one of {KERNEL_SHAPES}."
+    )
+
+
+def footprint_runs(footprint) -> np.ndarray:
+    """
+    Decompose a footprint into horizontal runs (dy, x_start, x_stop) so that
+    window sums can be taken from row prefix sums in O(rows) per pixel.
+    """
+    runs = []
+    for dy, row in enumerate(footprint):
+        x = 0
+        while x < row.size:
+            if row[x]:
+                start = x
+                while x < row.size and row[x]:
+                    x += 1
+                runs.append((dy, start, x))
+            else:
+                x += 1
+    return np.array(runs, dtype=np.int64)
+
+
+def _integral_window_sum(values, k):
+    """Sum over every k x k window of a padded block using an integral image."""
+    integral = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(values, axis=0), axis=1, out=integral[1:, 1:])
+    return integral[k:, k:] - integral[:-k, k:] - integral[k:, :-k] + integral[:-k, :-k]
+
+
+@numba.njit(cache=True, nogil=True)
+def _run_window_sum(values, runs, out_h, out_w):
+    # Row prefix sums turn every run into an O(1) difference
+    height, width = values.shape
+    prefix = np.zeros((height, width + 1), dtype=np.float64)
+    for i in range(height):
+        acc = 0.0
+        for j in range(width):
+            acc += values[i, j]
+            prefix[i, j + 1] = acc
+
+    out = np.zeros((out_h, out_w), dtype=np.float64)
+    for i in range(out_h):
+        for j in range(out_w):
+            total = 0.0
+            for r in range(runs.shape[0]):
+                row = i + runs[r, 0]
+                total += prefix[row, j + runs[r, 2]] - prefix[row, j + runs[r, 1]]
+            out[i, j] = total
+    return out
+
+
+@numba.njit(cache=True, nogil=True)
+def _sliding_extreme_1d(line, k, take_max):
+    n = line.size - k + 1
+    out = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        best = np.nan
+        for j in range(i, i + k):
+            v = line[j]
+            if np.isnan(v):
+                continue
+            if np.isnan(best) or (v > best if take_max else v < best):
+                best = v
+        out[i] = best
+    return out
+
+
+@numba.njit(cache=True, nogil=True)
+def _separable_extreme(block, k, take_max):
+    # Square min/max separates into a row pass followed by a column pass
+    height, width = block.shape
+    rows = np.empty((height, width - k + 1), dtype=np.float64)
+    for i in range(height):
+        rows[i, :] = _sliding_extreme_1d(block[i, :], k, take_max)
+    out = np.empty((height - k + 1, width - k + 1), dtype=np.float64)
+    for j in range(rows.shape[1]):
+        out[:, j] = _sliding_extreme_1d(rows[:, j].copy(), k, take_max)
+    return out
+
+
+@numba.njit(cache=True, nogil=True)
+def _footprint_stat(block, offsets, out_h, out_w, stat):
+    # stat: 0 = min, 1 = max, 2 = majority
+    out = np.full((out_h, out_w), np.nan, dtype=np.float64)
+    values = np.empty(offsets.shape[0], dtype=np.float64)
+    for i in range(out_h):
+        for j in range(out_w):
+            n = 0
+            for o in range(offsets.shape[0]):
+                v = block[i + offsets[o, 0], j + offsets[o, 1]]
+                if not np.isnan(v):
+                    values[n] = v
+                    n += 1
+            if n == 0:
+                continue
+            if stat == 0:
+                out[i, j] = values[:n].min()
+            elif stat == 1:
+                out[i, j] = values[:n].max()
+            else:
+                # Most frequent value, ties resolved towards the smallest value
+                ordered = np.sort(values[:n])
+                best, best_count, run = ordered[0], 1, 1
+                for m in range(1, n):
+                    run = run + 1 if ordered[m] == ordered[m - 1] else 1
+                    if run > best_count:
+                        best, best_count = ordered[m], run
+                out[i, j] = best
+    return out
+
+
+def focal_block(block, statistic, footprint, kernel_shape) -> np.ndarray:
+    """
+    Compute a focal statistic on a NaN-padded block (halo = kernel radius).
+    NaN pixels are ignored; windows without valid pixels yield NaN.
+    """
+    k = footprint.shape[0]
+    out_h, out_w = block.shape[0] - k + 1, block.shape[1] - k + 1
+
+    if statistic in ("mean", "std", "sum", "count"):
+        valid = ~np.isnan(block)
+        # Shift by the block mean to limit cancellation in the variance
+        shift = np.nanmean(block) if valid.any() else 0.0
+        centred = np.where(valid, block - shift, 0.0)
+        if kernel_shape == "square":
+            window_sum = lambda arr: _integral_window_sum(arr, k)
+        else:
+            runs = footprint_runs(footprint)
+            window_sum = lambda arr: _run_window_sum(arr, runs, out_h, out_w)
+
+        count = np.rint(window_sum(valid.astype(np.float64)))
+        if statistic == "count":
+            return count
+        total = window_sum(centred)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if statistic == "sum":
+                return np.where(count > 0, total + shift * count, np.nan)
+            mean = total / count
+            if statistic == "mean":
+                return np.where(count > 0, mean + shift, np.nan)
+            var = window_sum(centred * centred) / count - mean * mean
+            return np.where(count > 0, np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+    if statistic in ("min", "max", "range"):
+        if kernel_shape == "square":
+            extreme = lambda take_max: _separable_extreme(block, k, take_max)
+        else:
+            offsets = np.argwhere(footprint).astype(np.int64)
+            extreme = lambda take_max: _footprint_stat(
+                block, offsets, out_h, out_w, 1 if take_max else 0
+            )
+        if statistic == "min":
+            return extreme(False)
+        if statistic == "max":
+            return extreme(True)
+        return extreme(True) - extreme(False)
+
+    if statistic == "majority":
+        offsets = np.argwhere(footprint).astype(np.int64)
+        return _footprint_stat(block, offsets, out_h, out_w, 2)
+
+    raise ValueError(f"Unsupported statistic: {statistic}. Use one of {STATISTICS}.")
+
+
+def compute_focal_statistics(
+    config: str,
+    artifact_url: str,
+    statistic: str,
+    store_artifact: str,
+    file_path: str = None,
+    kernel_shape: str = "square",
+    radius: int = 1,
+    inner_radius: int = 0,
+    tile_size: int = 1024,
+    workers: int = None,
+    report_timings: bool = False,
+) -> str:
+    """
+    Compute focal (moving window) statistics such as mean, std, min, max, range or majority over a square, circular or annulus neighbourhood of the first raster band, ignoring nodata pixels. Optionally upload the result back to MinIO or save locally.In editor it will be renamed as generate-focal-statistics.
+    Parameters
+    ----------
+    config : str (Reactflow will ignore this parameter)
+    artifact_url : str (Reactflow will take it from the previous step)
+    statistic : enum [mean, std, sum, count, min, max, range, majority] (Reactflow will translate it as input)
+    store_artifact : str (Reactflow will ignore this parameter)
+    file_path : str (Reactflow will ignore this parameter)
+    kernel_shape : enum [square, circle, annulus] (Reactflow will translate it as input, This parameter will be optional)
+    radius : int (Reactflow will translate it as input, This parameter will be optional)
+    inner_radius : int (Reactflow will translate it as input, This parameter will be optional)
+    tile_size : int (Reactflow will ignore this parameter)
+    workers : int (Reactflow will ignore this parameter)
+    report_timings : bool (Reactflow will ignore this parameter)
+    """
+
+    if statistic not in STATISTICS:
+        raise ValueError(
+            f"Unsupported statistic: {statistic}. Use one of {STATISTICS}."
+        )
+    radius = int(radius)
+    footprint = build_footprint(kernel_shape, radius, int(inner_radius))
+
+    client = connect_minio(config)
+    bucket_name = get_bucket_name(config)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src_path = os.path.join(tmpdir, "input.tif")
+        focal_raw = os.path.join(tmpdir, "focal_raw.tif")
+        focal_cog = os.path.join(tmpdir, "focal_cog.tif")
+
+        try:
+            with client.get_object(bucket_name, artifact_url) as response:
+                with open(src_path, "wb") as f:
+                    f.write(response.read())
+        except Exception as e:
+            raise RuntimeError(f"[ERROR] Failed to download raster from MinIO: {e}")
+
+        try:
+            src_ds = gdal.Open(src_path)
+            if src_ds is None:
+                raise RuntimeError("Failed to open raster with GDAL.")
+            src_band = src_ds.GetRasterBand(1)
+            nodata = src_band.GetNoDataValue()
+            width, height = src_ds.RasterXSize, src_ds.RasterYSize
+
+            # Tiled output so blocks can be written without holding the full raster
+            driver = gdal.GetDriverByName("GTiff")
+            out_ds = driver.Create(
+                focal_raw,
+                width,
+                height,
+                1,
+                gdal.GDT_Float32,
+                options=["TILED=YES", "BIGTIFF=IF_SAFER", "COMPRESS=LZW"],
+            )
+            out_ds.SetGeoTransform(src_ds.GetGeoTransform())
+            out_ds.SetProjection(src_ds.GetProjection())
+            out_band = out_ds.GetRasterBand(1)
+            out_band.SetNoDataValue(NODATA)
+
+            def _compute(block):
+                result = focal_block(block, statistic, footprint, kernel_shape)
+                result[np.isnan(result)] = NODATA
+                return result.astype(np.float32)
+
+            run_blocks(
+                block_windows(width, height, int(tile_size)),
+                lambda window: read_block(src_band, window, radius, nodata),
+                _compute,
+                lambda window, result: out_band.WriteArray(
+                    result, window[0], window[1]
+                ),
+                workers=workers,
+                report_timings=report_timings,
+            )
+            out_band.FlushCache()
+            src_band, out_band = None, None
+            src_ds, out_ds = None, None
+
+            tiff_to_cogtiff(focal_raw, focal_cog)
+
+            if store_artifact:
+                saved_path = save_raster_artifact(
+                    config=config,
+                    local_path=focal_cog,
+                    file_path=file_path,
+                    store_artifact=store_artifact,
+                )
+                print(saved_path)
+                return saved_path
+            else:
+                print(
+                    "Data not saved. Set store_artifact to minio/local to save the data."
+                )
+                print("Focal statistics computed successfully.")
+                return None
+        except Exception as e:
+            raise RuntimeError(f"[ERROR] Focal statistics failed: {e}")
@@ -1,10 +1,8 @@
-import io
+import os
+import tempfile
 import numpy as np
-import rasterio
 import geopandas as gpd
-from skimage.measure import find_contours
-from shapely.geometry import LineString
-from tqdm import tqdm
+from osgeo import gdal, ogr
 import warnings
 from common.minio_ops import connect_minio, get_bucket_name
 from common.save_feature_artifact import save_feature
@@ -18,6 +16,7 @@ def isometric_lines(
     interval: float,
     store_artifact: str,
     file_path: str = None,
+    polygons: bool = False,
 ) -> str:
     """
     Generate isometric (contour) lines from DEM read from MinIO and given interval. Optionally upload the result back to MinIO or save locally.In editor it will be renamed as generate-isometric-lines.
@@ -28,74 +27,87 @@ def isometric_lines(
     interval : float (Reactflow will translate it as input)
     store_artifact : str (Reactflow will ignore this parameter)
     file_path : str (Reactflow will ignore this parameter)
+    polygons : enum [True, False] (Reactflow will translate it as input, This parameter will be optional)
     """
 
     minio_client = connect_minio(config)
     bucket_name = get_bucket_name(config)
 
-    try:
-        with minio_client.get_object(bucket_name, artifact_url) as response:
-            dem_bytes = response.read()
-        # print(f"[INFO] Downloaded DEM from MinIO: {artifact_url}")
-    except Exception as e:
-        raise RuntimeError(f"[ERROR] Failed to download DEM from MinIO: {e}")
-
-    try:
-        # Step 1: Read raster data using rasterio from bytes
-        with io.BytesIO(dem_bytes) as dem_buffer:
-            with rasterio.open(dem_buffer) as src:
-                if src.count != 1:
-                    raise ValueError("Input raster must have only one band.")
-                data = src.read(1)
-                transform = src.transform
-                raster_crs = src.crs
-
-        # Step 2: Define contour levels
-        min_val, max_val = np.nanmin(data), np.nanmax(data)
-        levels = np.arange(min_val, max_val, interval)
-
-        if len(levels) < 1:
-            raise ValueError(
-                "Contour interval is too large. Decrease the interval to generate contours."
-            )
-        elif len(levels) > 1000:
-            raise ValueError(
-                "Contour interval is too small. Increase the interval to limit contour generation."
-            )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dem_path = os.path.join(tmpdir, "dem.tif")
+        contour_path = os.path.join(tmpdir, "contours.gpkg")
 
-        # Step 3: Extract contour lines
-        geometries = []
-        contour_values = []
-
-        # for level in tqdm(levels, desc="Generating contours"):
-        for level in levels:
-            contours = find_contours(data, level)
-            for contour in contours:
-                coords = [tuple(transform * (x, y)) for y, x in contour]
-                if len(coords) > 1:
-                    geometries.append(LineString(coords))
-                    contour_values.append(level)
-
-        # Step 4: Create GeoDataFrame
-        geo_df = gpd.GeoDataFrame(
-            {"level": contour_values, "geometry": geometries}, crs=raster_crs
-        )
-
-        if store_artifact:
-            save_feature(
-                store_artifact=store_artifact,
-                gdf=geo_df,
-                file_path=file_path,
-                config_path=config,
-            )
-        else:
-            print(
-                "Data not saved. Set store_artifact to 'minio' or 'local' to save the data."
+        try:
+            minio_client.fget_object(bucket_name, artifact_url, dem_path)
+        except Exception as e:
+            raise RuntimeError(f"[ERROR] Failed to download DEM from MinIO: {e}")
+
+        try:
+            # Step 1: Open raster; GDAL streams it scanline by scanline below
+            dem_ds = gdal.Open(dem_path)
+            if dem_ds is None:
+                raise ValueError("Failed to open DEM raster with GDAL.")
+            if dem_ds.RasterCount != 1:
+                raise ValueError("Input raster must have only one band.")
+            band = dem_ds.GetRasterBand(1)
+            nodata = band.GetNoDataValue()
+
+            # Step 2: Define contour levels
+            min_val, max_val = band.ComputeRasterMinMax(False)
+            levels = np.arange(min_val, max_val, interval)
+
+            if len(levels) < 1:
+                raise ValueError(
+                    "Contour interval is too large. Decrease the interval to generate contours."
+                )
+            elif len(levels) > 1000:
+                raise ValueError(
+                    "Contour interval is too small. Increase the interval to limit contour generation."
+                )
+
+            # Step 3: Generate all levels in one pass straight into an OGR layer.
+            # GDAL applies the geotransform to the vertices in C, so no per-vertex
+            # Python transform is needed.
+            vector_ds = ogr.GetDriverByName("GPKG").CreateDataSource(contour_path)
+            layer = vector_ds.CreateLayer(
+                "contours",
+                srs=dem_ds.GetSpatialRef(),
+                geom_type=ogr.wkbMultiPolygon if polygons else ogr.wkbLineString,
             )
-            print("Clipping completed successfully.")
+            options = ["FIXED_LEVELS=" + ",".join(str(float(lv)) for lv in levels)]
+            if polygons:
+                layer.CreateField(ogr.FieldDefn("level_min", ogr.OFTReal))
+                layer.CreateField(ogr.FieldDefn("level_max", ogr.OFTReal))
+                options += ["ELEV_FIELD_MIN=0", "ELEV_FIELD_MAX=1", "POLYGONIZE=YES"]
+            else:
+                layer.CreateField(ogr.FieldDefn("level", ogr.OFTReal))
+                options += ["ELEV_FIELD=0"]
+            if nodata is not None:
+                options.append(f"NODATA={nodata}")
+
+            if gdal.ContourGenerateEx(band, layer, options=options) != 0:
+                raise RuntimeError("GDAL contour generation failed.")
+            layer, band = None, None
+            vector_ds, dem_ds = None, None
+
+            # Step 4: Create GeoDataFrame
+            geo_df = gpd.read_file(contour_path)
+
+            if store_artifact:
+                save_feature(
+                    store_artifact=store_artifact,
+                    gdf=geo_df,
+                    file_path=file_path,
+                    config_path=config,
+                )
+            else:
+                print(
+                    "Data not saved. Set store_artifact to 'minio' or 'local' to save the data."
+                )
+                print("Contour generation completed successfully.")
 
-    except Exception as e:
-        raise RuntimeError(f"[ERROR] Contour generation failed: {e}")
+        except Exception as e:
+            raise RuntimeError(f"[ERROR] Contour generation failed: {e}")
 
 
 # isometric_lines(
@@ -6,9 +6,10 @@ from osgeo import gdal
 from common.minio_ops import connect_minio, get_bucket_name
 from common.convert_to_cog import tiff_to_cogtiff
 from common.save_raster_artifact import save_raster_artifact
+from common.block_engine import block_windows, read_block, run_blocks
 
 
-@numba.njit
+@numba.njit(cache=True, nogil=True)
 def local_corr_numba(dem_win, lst_win):
     n = 0
     sum_x = 0.0
@@ -36,7 +37,7 @@ def local_corr_numba(dem_win, lst_win):
     return numerator / denominator
 
 
-@numba.njit
+@numba.njit(cache=True, nogil=True)
 def compute_corr_chunk(dem_chunk, lst_chunk, pad):
     height, width = dem_chunk.shape
     corr_chunk = np.full((height - 2 * pad, width - 2 * pad), np.nan, dtype=np.float64)
@@ -48,18 +49,6 @@ def compute_corr_chunk(dem_chunk, lst_chunk, pad):
     return corr_chunk
 
 
-def read_array(dataset, xoff, yoff, xsize, ysize, nodata):
-    arr = dataset.ReadAsArray(xoff, yoff, xsize, ysize).astype(np.float64)
-    arr[arr == nodata] = np.nan
-    return arr
-
-
-def write_array(dataset, arr, xoff, yoff):
-    band = dataset.GetRasterBand(1)
-    band.WriteArray(arr, xoff, yoff)
-    band.FlushCache()
-
-
 def compute_local_correlation_5x5(
     config,
     dem_artifact_url,
@@ -67,6 +56,8 @@ def compute_local_correlation_5x5(
     chunk_size=500,
     store_artifact=False,
     file_path=None,
+    workers=None,
+    report_timings=False,
 )-> str:
     """
     Compute local (5x5) correlation between two rasters. Optionally upload the result back to MinIO or save locally.In editor it will be renamed as generate-local-correlation.
@@ -78,6 +69,8 @@ def compute_local_correlation_5x5(
     chunk_size : int (Reactflow will translate it as input)
     store_artifact : str (Reactflow will ignore this parameter)
     file_path : str (Reactflow will ignore this parameter)
+    workers : int (Reactflow will ignore this parameter)
+    report_timings : bool (Reactflow will ignore this parameter)
     """
     window_size = 5
     pad = window_size // 2
@@ -125,25 +118,39 @@ def compute_local_correlation_5x5(
     out_band.Fill(-9999.0)
     out_ds = None
 
-    # Step 3: Chunk-wise correlation
+    # Step 3: Tile-parallel correlation over halo-padded chunks
     dem_ds = gdal.Open(temp_dem)
     lst_ds = gdal.Open(aligned_lst)
     out_ds = gdal.Open(raw_out, gdal.GA_Update)
+    dem_band = dem_ds.GetRasterBand(1)
+    lst_band = lst_ds.GetRasterBand(1)
+    out_band = out_ds.GetRasterBand(1)
 
-    for y in range(0, height, chunk_size):
-        for x in range(0, width, chunk_size):
-            xsize = min(chunk_size + window_size - 1, width - x)
-            ysize = min(chunk_size + window_size - 1, height - y)
-            dem_chunk = read_array(dem_ds, x, y, xsize, ysize, dem_nodata)
-            lst_chunk = read_array(lst_ds, x, y, xsize, ysize, -9999.0)
-
-            if dem_chunk.shape != lst_chunk.shape:
-                continue
-
-            corr_chunk = compute_corr_chunk(dem_chunk, lst_chunk, pad)
-            corr_chunk[np.isnan(corr_chunk)] = -9999.0
-            write_array(out_ds, corr_chunk.astype(np.float32), x + pad, y + pad)
+    def _read(window):
+        return (
+            read_block(dem_band, window, pad, dem_nodata),
+            read_block(lst_band, window, pad, -9999.0),
+        )
+
+    def _compute(chunks):
+        corr_chunk = compute_corr_chunk(chunks[0], chunks[1], pad)
+        corr_chunk[np.isnan(corr_chunk)] = -9999.0
+        return corr_chunk.astype(np.float32)
+
+    def _write(window, corr_chunk):
+        out_band.WriteArray(corr_chunk, window[0], window[1])
+
+    run_blocks(
+        block_windows(width, height, chunk_size),
+        _read,
+        _compute,
+        _write,
+        workers=workers,
+        report_timings=report_timings,
+    )
+    out_band.FlushCache()
 
+    dem_band, lst_band, out_band = None, None, None
     dem_ds, lst_ds, out_ds = None, None, None
 
     # Step 4: Convert to COG
@@ -1,13 +1,14 @@
 import os
-import io
+import shutil
 import tempfile
-import numpy as np
 import geopandas as gpd
+import shapely
 import warnings
-from osgeo import gdal, ogr, osr
-from shapely.geometry import mapping
+from osgeo import gdal
 from common.minio_ops import connect_minio, get_bucket_name
 from common.save_feature_artifact import save_feature
+from common.zonal_stats import parse_reducers, zonal_statistics
+from common.vector_io import read_vector
 
 warnings.filterwarnings("ignore")
 
@@ -20,9 +21,13 @@ def extract_raster_to_vector(
     attribute: str,
     store_artifact: str,
     file_path: str = None,
+    bands: str = "1",
+    histogram_bins: int = 10,
+    coverage_mode: str = "binary",
+    raster_extent_only: bool = False,
 ) -> str:
     """
-    Extract raster values to vector features using polygonized raster and spatial join with reducer. Optionally upload the result back to MinIO or save locally.In editor it will be renamed as reduce-to-feature.
+    Extract raster values to vector features by reducing the raster pixels under each feature (zonal statistics). Several comma separated reducers (mean, min, max, count, sum, std, median, majority, histogram and percentiles such as p90) can be computed for several bands in one pass; each is written to its own column named <attribute>_<reducer> (or <attribute>_b<band>_<reducer> for more than one band), a single reducer on a single band keeps the plain <attribute> column. With coverage_mode fractional, pixels are weighted by the exact fraction covered by each polygon instead of the pixel-centre rule, which keeps small polygons accurate without resampling the raster. With raster_extent_only only the features whose bbox meets the raster extent are read and kept (for FlatGeobuf artifacts just those features are fetched from MinIO). Optionally upload the result back to MinIO or save locally.In editor it will be renamed as reduce-to-feature.
     Parameters
     ----------
     config : str (Reactflow will ignore this parameter)
@@ -32,8 +37,17 @@ def extract_raster_to_vector(
     attribute : str (Reactflow will translate it as input)
     store_artifact : str (Reactflow will ignore this parameter)
     file_path : str (Reactflow will ignore this parameter)
+    bands : str (Reactflow will translate it as input, This parameter will be optional)
+    histogram_bins : int (Reactflow will translate it as input, This parameter will be optional)
+    coverage_mode : enum [binary, fractional] (Reactflow will translate it as input, This parameter will be optional)
+    raster_extent_only : bool (Reactflow will translate it as input, This parameter will be optional)
     """
 
+    reducers = parse_reducers(reducer)
+    band_list = [int(b) for b in str(bands).split(",") if b.strip()]
+    if not band_list:
+        raise ValueError("At least one band is required.")
+
     client = connect_minio(config)
     bucket_name = get_bucket_name(config)
     temp_dir = tempfile.mkdtemp()
@@ -45,75 +59,53 @@ def extract_raster_to_vector(
             with open(temp_raster_path, "wb") as f:
                 f.write(response.read())
 
-        # --- Step 2: Read vector data ---
-        with client.get_object(bucket_name, vector_artifact_url) as response:
-            vec_gdf = gpd.read_file(io.BytesIO(response.read()))
+        raster_ds = gdal.Open(temp_raster_path)
+        if raster_ds is None:
+            raise RuntimeError("Failed to open raster with GDAL.")
+        raster_wkt = raster_ds.GetProjection()
+        gt = raster_ds.GetGeoTransform()
+        width, height = raster_ds.RasterXSize, raster_ds.RasterYSize
+        raster_ds = None
+
+        # --- Step 2: Read vector data, optionally only within the raster ---
+        bbox = None
+        if raster_extent_only:
+            corners = [(0, 0), (width, 0), (0, height), (width, height)]
+            xs = [gt[0] + c * gt[1] + r * gt[2] for c, r in corners]
+            ys = [gt[3] + c * gt[4] + r * gt[5] for c, r in corners]
+            extent = shapely.box(min(xs), min(ys), max(xs), max(ys))
+            bbox = gpd.GeoSeries([extent], crs=raster_wkt or None)
+        vec_gdf = read_vector(client, bucket_name, vector_artifact_url, bbox=bbox)
 
         # ---  Explode MultiPolygons ---
         vec_gdf = vec_gdf.explode(index_parts=False).reset_index(drop=True)
 
-        # --- Step 3: Open raster ---
-        raster_ds = gdal.Open(temp_raster_path)
-        band = raster_ds.GetRasterBand(1)
-        nodata = band.GetNoDataValue()
-        geotransform = raster_ds.GetGeoTransform()
-        inv_gt = gdal.InvGeoTransform(geotransform)
-        arr = band.ReadAsArray().astype(np.float64)
-        arr[arr == nodata] = np.nan
-
-        # --- Step 4: Sample raster values per vector feature ---
-        results = []
-        wkt = raster_ds.GetProjection()
-        srs = osr.SpatialReference()
-        srs.ImportFromWkt(wkt)
-
-        for geom in vec_gdf.geometry:
-            mask_ds = gdal.GetDriverByName("MEM").Create(
-                "", raster_ds.RasterXSize, raster_ds.RasterYSize, 1, gdal.GDT_Byte
-            )
-            mask_ds.SetGeoTransform(geotransform)
-            mask_ds.SetProjection(raster_ds.GetProjection())
-
-            # Create in-memory layer
-            mem_drv = ogr.GetDriverByName("Memory")
-            mem_ds = mem_drv.CreateDataSource("out")
-            mem_layer = mem_ds.CreateLayer("layer", srs=srs, geom_type=ogr.wkbPolygon)
-            feature_def = mem_layer.GetLayerDefn()
-
-            # Convert Shapely geometry to OGR
-            ogr_geom = ogr.CreateGeometryFromWkb(geom.wkb)
-            feature = ogr.Feature(feature_def)
-            feature.SetGeometry(ogr_geom)
-            mem_layer.CreateFeature(feature)
-
-            # Rasterize the single-feature layer
-            gdal.RasterizeLayer(mask_ds, [1], mem_layer, burn_values=[1])
-
-            # Cleanup
-            feature = None
-            mem_ds = None
-
-            mask_arr = mask_ds.ReadAsArray().astype(bool)
-            masked_values = arr[mask_arr]
-
-            if masked_values.size == 0:
-                results.append(np.nan)
+        # --- Step 3: Align vector to the raster CRS ---
+
+        zones = vec_gdf.geometry
+        if raster_wkt and zones.crs is not None and not zones.crs.equals(raster_wkt):
+            zones = zones.to_crs(raster_wkt)
+
+        # --- Step 4: Zonal statistics for all bands and reducers in one pass ---
+        results = zonal_statistics(
+            temp_raster_path,
+            zones.values,
+            reducers,
+            bands=band_list,
+            tmp_dir=temp_dir,
+            histogram_bins=histogram_bins,
+            coverage_mode=coverage_mode,
+        )
+
+        # --- Step 5: Assign to new columns ---
+        for (band, name), values in results.items():
+            if len(reducers) == 1 and len(band_list) == 1:
+                column = attribute
+            elif len(band_list) == 1:
+                column = f"{attribute}_{name}"
             else:
-                if reducer == "mean":
-                    results.append(np.nanmean(masked_values))
-                elif reducer == "min":
-                    results.append(np.nanmin(masked_values))
-                elif reducer == "max":
-                    results.append(np.nanmax(masked_values))
-                elif reducer == "sum":
-                    results.append(np.nansum(masked_values))
-                elif reducer == "count":
-                    results.append(np.sum(~np.isnan(masked_values)))
-                else:
-                    raise ValueError(f"Unsupported reducer: {reducer}")
-
-        # --- Step 5: Assign to new column ---
-        vec_gdf[attribute] = results
+                column = f"{attribute}_b{band}_{name}"
+            vec_gdf[column] = values
 
         # --- Step 6: Save ---
         if store_artifact:
@@ -132,8 +124,4 @@ def extract_raster_to_vector(
         raise RuntimeError(f"[ERROR] Failed during raster-to-vector extraction: {e}")
 
     finally:
-        try:
-            os.remove(temp_raster_path)
-            os.rmdir(temp_dir)
-        except Exception:
-            pass
+        shutil.rmtree(temp_dir, ignore_errors=True)
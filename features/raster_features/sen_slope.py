@@ -12,6 +12,7 @@ import time
 from common.minio_ops import connect_minio, get_bucket_name
 from common.convert_to_cog import tiff_to_cogtiff
 from common.save_raster_artifact import save_raster_artifact
+from common.reproject_cache import fetch_reprojected
 
 
 # -------------------------------
@@ -263,27 +264,30 @@ def compute_sen_slope(
 
     try:
         # -----------------------------
-        # Step 2: Download rasters
+        # Step 2: Download rasters, reusing cached EPSG:7755 warps
         # -----------------------------
         for fp in df["filepath"]:
-            # ensure nested dirs exist locally
             local_basename = os.path.basename(fp)
             local_fp = os.path.join(tmp_dir, local_basename)
-
-            # client.get_object returns a file-like object; use copyfileobj for streaming
-            obj = client.get_object(bucket_name, fp)
-            with open(local_fp, "wb") as out_f:
-                shutil.copyfileobj(obj, out_f)
-            # close obj if it exposes close
-            try:
-                obj.close()
-            except Exception:
-                pass
-
-            local_rasters.append(local_fp)
+            reproj_fp = os.path.join(tmp_dir, f"reproj_{local_basename}")
+
+            local_rasters.append(
+                fetch_reprojected(
+                    client,
+                    bucket_name,
+                    fp,
+                    local_fp,
+                    reproj_fp,
+                    dst_srs=f"EPSG:{TARGET_EPSG}",
+                    resample_alg="near",
+                    src_nodata=NODATA,
+                    dst_nodata=NODATA,
+                )
+            )
 
         # -----------------------------
         # Step 3: Fix NoData + Reproject + Fill
+        # (NoData and projection are normally already fixed by the cache step)
         # -----------------------------
         for r in local_rasters:
             proc = _fix_nodata_and_reproject(
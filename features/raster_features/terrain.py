@@ -0,0 +1,243 @@
+import os
+import tempfile
+import warnings
+import numpy as np
+from osgeo import gdal
+from common.minio_ops import connect_minio, get_bucket_name
+from common.convert_to_cog import tiff_to_cogtiff
+from common.save_raster_artifact import save_raster_artifact
+from common.block_engine import block_windows, read_block, run_blocks
+from common.reproject_cache import fetch_reprojected
+
+warnings.filterwarnings("ignore")
+
+NODATA = -9999.0
+TARGET_EPSG = 7755
+PRODUCTS = [
+    "slope",
+    "aspect",
+    "hillshade",
+    "multidirectional_hillshade",
+    "profile_curvature",
+    "plan_curvature",
+    "tri",
+    "tpi",
+]
+
+
+def _hillshade(dzdx, dzdn, azimuth, altitude):
+    """Lambertian hillshade (0-255) for gradients towards east and north."""
+    az, alt = np.radians(azimuth), np.radians(altitude)
+    light = np.sin(az) * np.cos(alt), np.cos(az) * np.cos(alt), np.sin(alt)
+    norm = np.sqrt(dzdx * dzdx + dzdn * dzdn + 1.0)
+    shade = (-dzdx * light[0] - dzdn * light[1] + light[2]) / norm
+    return 255.0 * np.clip(shade, 0.0, 1.0)
+
+
+def terrain_block(
+    block, products, xres, yres, z_factor=1.0, azimuth=315.0, altitude=45.0
+) -> np.ndarray:
+    """
+    Compute terrain derivatives for a NaN-padded block (halo = 1).
+    Returns an array of shape (len(products), rows, cols).
+    """
+    e = block[1:-1, 1:-1]
+    # 3x3 neighbourhood (a b c / d e f / g h i); missing neighbours take the
+    # centre value so edges and nodata borders degrade gracefully
+    nb = {}
+    for name, (dy, dx) in {
+        "a": (0, 0),
+        "b": (0, 1),
+        "c": (0, 2),
+        "d": (1, 0),
+        "f": (1, 2),
+        "g": (2, 0),
+        "h": (2, 1),
+        "i": (2, 2),
+    }.items():
+        win = block[dy : dy + e.shape[0], dx : dx + e.shape[1]]
+        nb[name] = np.where(np.isnan(win), e, win) * z_factor
+    a, b, c, d, f, g, h, i = (nb[k] for k in "abcdfghi")
+    e = e * z_factor
+
+    # Horn's method, gradients towards east and north
+    dzdx = ((c + 2 * f + i) - (a + 2 * d + g)) / (8.0 * xres)
+    dzdn = ((a + 2 * b + c) - (g + 2 * h + i)) / (8.0 * yres)
+
+    out = np.empty((len(products),) + e.shape, dtype=np.float64)
+    for idx, product in enumerate(products):
+        if product == "slope":
+            out[idx] = np.degrees(np.arctan(np.hypot(dzdx, dzdn)))
+        elif product == "aspect":
+            aspect = np.degrees(np.arctan2(-dzdx, -dzdn)) % 360.0
+            out[idx] = np.where((dzdx == 0) & (dzdn == 0), np.nan, aspect)
+        elif product == "hillshade":
+            out[idx] = _hillshade(dzdx, dzdn, azimuth, altitude)
+        elif product == "multidirectional_hillshade":
+            aspect = np.arctan2(-dzdx, -dzdn)
+            combined = np.zeros_like(e)
+            for az in (225.0, 270.0, 315.0, 360.0):
+                weight = np.sin(aspect - np.radians(az)) ** 2
+                combined += weight * _hillshade(dzdx, dzdn, az, altitude)
+            out[idx] = combined / 2.0
+        elif product in ("profile_curvature", "plan_curvature"):
+            # Zevenbergen & Thorne (1987) quadratic surface coefficients
+            D = ((d + f) / 2.0 - e) / (xres * xres)
+            E = ((b + h) / 2.0 - e) / (yres * yres)
+            F = (-a + c + g - i) / (4.0 * xres * yres)
+            G = (f - d) / (2.0 * xres)
+            H = (b - h) / (2.0 * yres)
+            grad2 = G * G + H * H
+            with np.errstate(invalid="ignore", divide="ignore"):
+                if product == "profile_curvature":
+                    curv = -2.0 * (D * G * G + E * H * H + F * G * H) / grad2
+                else:
+                    curv = 2.0 * (D * H * H + E * G * G - F * G * H) / grad2
+            out[idx] = np.where(grad2 > 0, curv, 0.0)
+        elif product == "tri":
+            out[idx] = np.sqrt(sum((n - e) ** 2 for n in (a, b, c, d, f, g, h, i)))
+        elif product == "tpi":
+            out[idx] = e - (a + b + c + d + f + g + h + i) / 8.0
+        else:
+            raise ValueError(
+                f"Unsupported terrain product: {product}. Use any of {PRODUCTS}."
+            )
+
+    out[:, np.isnan(e)] = np.nan
+    return out
+
+
+def compute_terrain(
+    config: str,
+    artifact_url: str,
+    store_artifact: str,
+    file_path: str = None,
+    products: str = "slope,aspect,hillshade",
+    z_factor: float = 1.0,
+    azimuth: float = 315.0,
+    altitude: float = 45.0,
+    tile_size: int = 1024,
+    workers: int = None,
+) -> str:
+    """
+    Function to compute several terrain derivatives (slope, aspect, hillshade, multidirectional hillshade, profile/plan curvature, TRI, TPI) from a DEM in a single pass and write them as bands of one COG. Optionally upload the result back to MinIO or save locally.In editor it will be renamed as generate-terrain.
+    Parameters
+    ----------
+    config : str (Reactflow will ignore this parameter)
+    artifact_url : str (Reactflow will take it from the previous step)
+    store_artifact : str (Reactflow will ignore this parameter)
+    file_path : str (Reactflow will ignore this parameter)
+    products : str (Reactflow will translate it as input, This parameter will be optional)
+    z_factor : float (Reactflow will translate it as input, This parameter will be optional)
+    azimuth : float (Reactflow will translate it as input, This parameter will be optional)
+    altitude : float (Reactflow will translate it as input, This parameter will be optional)
+    tile_size : int (Reactflow will ignore this parameter)
+    workers : int (Reactflow will ignore this parameter)
+    """
+
+    product_list = [p.strip().lower() for p in products.split(",") if p.strip()]
+    unknown = [p for p in product_list if p not in PRODUCTS]
+    if not product_list or unknown:
+        raise ValueError(
+            f"Unsupported terrain products: {unknown}. Use any of {PRODUCTS}."
+        )
+
+    client = connect_minio(config)
+    bucket_name = get_bucket_name(config)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dem_path = os.path.join(tmpdir, "dem.tif")
+        dem_7755 = os.path.join(tmpdir, "dem_7755.tif")
+        terrain_raw = os.path.join(tmpdir, "terrain_raw.tif")
+        terrain_cog = os.path.join(tmpdir, "terrain_cog.tif")
+
+        try:
+            # Download DEM once for all products, reusing a cached EPSG:7755 warp
+            dem_for_terrain = fetch_reprojected(
+                client,
+                bucket_name,
+                artifact_url,
+                dem_path,
+                dem_7755,
+                dst_srs=f"EPSG:{TARGET_EPSG}",
+                resample_alg="bilinear",
+            )
+        except Exception as e:
+            raise RuntimeError(f"[ERROR] Failed to fetch DEM from MinIO: {e}")
+
+        try:
+            src_ds = gdal.Open(dem_for_terrain)
+            if src_ds is None:
+                raise RuntimeError("Failed to open DEM raster with GDAL.")
+            dem_band = src_ds.GetRasterBand(1)
+            nodata = dem_band.GetNoDataValue()
+            width, height = src_ds.RasterXSize, src_ds.RasterYSize
+            geotransform = src_ds.GetGeoTransform()
+            xres, yres = abs(geotransform[1]), abs(geotransform[5])
+
+            driver = gdal.GetDriverByName("GTiff")
+            out_ds = driver.Create(
+                terrain_raw,
+                width,
+                height,
+                len(product_list),
+                gdal.GDT_Float32,
+                options=["TILED=YES", "BIGTIFF=IF_SAFER", "COMPRESS=LZW"],
+            )
+            out_ds.SetGeoTransform(geotransform)
+            out_ds.SetProjection(src_ds.GetProjection())
+            out_bands = []
+            for idx, product in enumerate(product_list, start=1):
+                band = out_ds.GetRasterBand(idx)
+                band.SetNoDataValue(NODATA)
+                band.SetDescription(product)
+                out_bands.append(band)
+
+            def _compute(block):
+                result = terrain_block(
+                    block,
+                    product_list,
+                    xres,
+                    yres,
+                    z_factor=float(z_factor),
+                    azimuth=float(azimuth),
+                    altitude=float(altitude),
+                )
+                result[np.isnan(result)] = NODATA
+                return result.astype(np.float32)
+
+            def _write(window, result):
+                for band, data in zip(out_bands, result):
+                    band.WriteArray(data, window[0], window[1])
+
+            run_blocks(
+                block_windows(width, height, int(tile_size)),
+                lambda window: read_block(dem_band, window, 1, nodata),
+                _compute,
+                _write,
+                workers=workers,
+            )
+            for band in out_bands:
+                band.FlushCache()
+            dem_band, out_bands, band = None, None, None
+            src_ds, out_ds = None, None
+
+            tiff_to_cogtiff(terrain_raw, terrain_cog)
+
+            if store_artifact:
+                saved_path = save_raster_artifact(
+                    config=config,
+                    local_path=terrain_cog,
+                    file_path=file_path,
+                    store_artifact=store_artifact,
+                )
+                print(saved_path)
+                return saved_path
+            else:
+                print(
+                    "Data not saved. Set store_artifact to minio/local to save the data."
+                )
+                print("Terrain attributes computed successfully.")
+                return None
+        except Exception as e:
+            raise RuntimeError(f"[ERROR] Terrain computation failed: {e}")
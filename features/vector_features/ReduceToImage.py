@@ -1,143 +1,295 @@
 import geopandas as gpd
 import rasterio
 import numpy as np
+from rasterio.features import rasterize
 from rasterio.transform import from_origin
 import io
 import os
 import pandas as pd
-from shapely.geometry import box
-from osgeo import gdal, gdalconst
+import shapely
+from osgeo import gdal, gdalconst, ogr
 
+from common.block_engine import block_windows
 from common.minio_ops import connect_minio, get_bucket_name
 from common.save_raster_artifact import save_raster_artifact
 
+NODATA = -9999.0
+# Tile side (in cells) a line/polygon's bounding box is rasterized in for
+# the mode and concat reducers
+FEATURE_TILE = 1024
 
-def create_grid(gdf, grid_size) -> gpd.GeoDataFrame:
-    if gdf.crs.to_epsg() == 4326:
-        gdf = gdf.to_crs(epsg=7755)
 
-    bounds = gdf.total_bounds
-    minx, miny, maxx, maxy = bounds
-    x_coords = np.arange(minx, maxx, grid_size)
-    y_coords = np.arange(miny, maxy, grid_size)
+def grid_shape(gdf, grid_size):
+    """
+    Origin (left, top) and size (ncols, nrows) of the implicit output grid:
+    cells of `grid_size` laid out from the lower-left corner of the layer.
+    """
+    minx, miny, maxx, maxy = gdf.total_bounds
+    ncols = max(1, len(np.arange(minx, maxx, grid_size)))
+    nrows = max(1, len(np.arange(miny, maxy, grid_size)))
+    return minx, miny + nrows * grid_size, ncols, nrows
+
 
-    grid_cells = [
-        box(x, y, x + grid_size, y + grid_size) for x in x_coords for y in y_coords
-    ]
-    return gpd.GeoDataFrame({"geometry": grid_cells}, crs=gdf.crs)
+def point_cells(points, grid_size, minx, top, ncols, nrows) -> np.ndarray:
+    """Row-major cell index of every point, by floor division of its coordinates."""
+    x, y = shapely.get_x(points), shapely.get_y(points)
+    col = np.clip(np.floor((x - minx) / grid_size), 0, ncols - 1).astype(np.int64)
+    row = np.clip(np.floor((top - y) / grid_size), 0, nrows - 1).astype(np.int64)
+    return row * ncols + col
 
 
-def apply_reducer(grid, vector_data, attribute, reducer) -> gpd.GeoDataFrame:
-    if attribute not in vector_data.columns:
-        raise ValueError(f"Attribute '{attribute}' not found in vector data.")
+def rasterize_features(
+    geoms, burn_values, grid_size, minx, top, ncols, nrows, merge_alg="REPLACE"
+) -> np.ndarray:
+    """
+    Burn `burn_values` of lines/polygons onto the grid with GDAL (all touched
+    cells). Features are burnt in the given order, so with REPLACE the last
+    feature covering a cell wins; ADD accumulates.
+    """
+    mem_ds = ogr.GetDriverByName("Memory").CreateDataSource("features")
+    layer = mem_ds.CreateLayer("features", geom_type=ogr.wkbUnknown)
+    layer.CreateField(ogr.FieldDefn("value", ogr.OFTReal))
+    feature_def = layer.GetLayerDefn()
+    for geom, value in zip(geoms, burn_values):
+        feature = ogr.Feature(feature_def)
+        feature.SetField("value", float(value))
+        feature.SetGeometry(ogr.CreateGeometryFromWkb(geom.wkb))
+        layer.CreateFeature(feature)
+        feature = None
+
+    raster = gdal.GetDriverByName("MEM").Create("", ncols, nrows, 1, gdal.GDT_Float64)
+    raster.SetGeoTransform((minx, grid_size, 0, top, 0, -grid_size))
+    gdal.RasterizeLayer(
+        raster,
+        [1],
+        layer,
+        options=["ATTRIBUTE=value", "ALL_TOUCHED=TRUE", f"MERGE_ALG={merge_alg}"],
+    )
+    burnt = raster.GetRasterBand(1).ReadAsArray().ravel()
+    raster, layer, mem_ds = None, None, None
+    return burnt
+
+
+def grid_cells(gdf, grid_size, minx, top, ncols, nrows):
+    """
+    (feature index, cell index) pairs for every cell a feature touches,
+    ordered by cell and then input order. Lines and polygons are rasterized
+    one at a time (all touched cells, as for the numeric reducers) into
+    tiles of their own bounding box, so no full grid is built and one
+    feature never holds more than FEATURE_TILE**2 cells at once.
+    """
+    geoms = gdf.geometry.values
+    is_point = np.asarray(gdf.geom_type == "Point")
+    features, cells = [], []
+
+    if is_point.any():
+        features.append(np.flatnonzero(is_point))
+        cells.append(point_cells(geoms[is_point], grid_size, minx, top, ncols, nrows))
+
+    others = np.flatnonzero(
+        ~is_point & ~gdf.geometry.isna().values & ~shapely.is_empty(geoms)
+    )
+    if others.size:
+        bounds = shapely.bounds(geoms[others])
+        c0 = np.clip(np.floor((bounds[:, 0] - minx) / grid_size), 0, ncols - 1)
+        c1 = np.clip(np.floor((bounds[:, 2] - minx) / grid_size), 0, ncols - 1)
+        r0 = np.clip(np.floor((top - bounds[:, 3]) / grid_size), 0, nrows - 1)
+        r1 = np.clip(np.floor((top - bounds[:, 1]) / grid_size), 0, nrows - 1)
+        c0, c1, r0, r1 = (a.astype(np.int64) for a in (c0, c1, r0, r1))
+
+        for i, feature in enumerate(others):
+            for xoff, yoff, width, height in block_windows(
+                c1[i] - c0[i] + 1, r1[i] - r0[i] + 1, FEATURE_TILE
+            ):
+                col0, row0 = c0[i] + xoff, r0[i] + yoff
+                touched = rasterize(
+                    [(geoms[feature], 1)],
+                    out_shape=(height, width),
+                    transform=from_origin(
+                        minx + col0 * grid_size,
+                        top - row0 * grid_size,
+                        grid_size,
+                        grid_size,
+                    ),
+                    all_touched=True,
+                    dtype=np.uint8,
+                )
+                row, col = np.nonzero(touched)
+                features.append(np.full(row.size, feature))
+                cells.append((row0 + row) * ncols + col0 + col)
+
+    if not features:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    features, cells = np.concatenate(features), np.concatenate(cells)
+    # Keep the input feature order inside every cell for concat
+    order = np.lexsort((features, cells))
+    return features[order], cells[order]
+
+
+def reduce_numeric(gdf, values, reducer, grid_size, minx, top, ncols, nrows):
+    """
+    count, density, sum and mean per cell as a flat grid array (NaN where no
+    feature contributes). `values` is only read for sum and mean. Points are
+    binned, lines and polygons are burnt with GDAL's ADD merge algorithm.
+    """
+    geoms = gdf.geometry.values
+    is_point = np.asarray(gdf.geom_type == "Point")
+    is_other = ~is_point & ~gdf.geometry.isna().values
+    size = nrows * ncols
+    pts = point_cells(geoms[is_point], grid_size, minx, top, ncols, nrows)
+
+    def _add(mask, burn):
+        grid = np.bincount(
+            pts[mask[is_point]], weights=burn[mask & is_point], minlength=size
+        )
+        if (mask & is_other).any():
+            grid += rasterize_features(
+                geoms[mask & is_other],
+                burn[mask & is_other],
+                grid_size,
+                minx,
+                top,
+                ncols,
+                nrows,
+                merge_alg="ADD",
+            )
+        return grid
+
+    ones = np.ones(len(gdf))
+    if reducer in ["count", "density"]:
+        count = _add(np.ones(len(gdf), dtype=bool), ones)
+        if reducer == "density":
+            area = grid_size * grid_size / 1e6
+            count = count / area if area > 0 else np.zeros_like(count)
+        return np.where(count > 0, count, np.nan)
+
+    valid = ~np.isnan(values)
+    count = _add(valid, ones)
+    total = _add(valid, np.where(valid, values, 0.0))
+    if reducer == "sum":
+        return np.where(count > 0, total, np.nan)
+    return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def select_feature(gdf, key, grid_size, minx, top, ncols, nrows) -> np.ndarray:
+    """
+    Index of the feature with the largest `key` per cell (-1 where none);
+    features with NaN keys are skipped. Drives min/max/first/last: lines and
+    polygons are burnt in ascending key order so the winner is burnt last.
+    """
+    geoms = gdf.geometry.values
+    is_point = np.asarray(gdf.geom_type == "Point") & ~np.isnan(key)
+    is_other = ~np.asarray(gdf.geom_type == "Point") & ~gdf.geometry.isna().values
+    is_other &= ~np.isnan(key)
+
+    # Dense rank (1..n) so ranks survive the Float64 burn exactly
+    order = np.argsort(np.where(np.isnan(key), -np.inf, key), kind="stable")
+    rank = np.empty(len(key), dtype=np.int64)
+    rank[order] = np.arange(1, len(key) + 1)
+
+    best = np.zeros(nrows * ncols, dtype=np.int64)
+    pts = point_cells(geoms[is_point], grid_size, minx, top, ncols, nrows)
+    np.maximum.at(best, pts, rank[is_point])
+
+    others = np.flatnonzero(is_other)
+    if others.size:
+        others = others[np.argsort(rank[others])]
+        burnt = rasterize_features(
+            geoms[others], rank[others], grid_size, minx, top, ncols, nrows
+        )
+        best = np.maximum(best, burnt.astype(np.int64))
+
+    winner = np.full(best.size, -1, dtype=np.int64)
+    winner[best > 0] = order[best[best > 0] - 1]
+    return winner
 
-    attribute_dtype = vector_data[attribute].dtype
-    is_numeric = np.issubdtype(attribute_dtype, np.number)
 
-    if reducer in ["min", "max", "sum", "mean"] and not is_numeric:
-        raise ValueError(
-            f"Reducer '{reducer}' can only be applied to numeric attributes."
+def apply_reducer(features, cells, vector_data, attribute, reducer):
+    """
+    mode/concat of `attribute` per cell from (feature, cell) pairs. Returns
+    the cell ids and their labels.
+    """
+    values = pd.Series(vector_data[attribute].values[features])
+    if reducer == "concat":
+        labels = values.groupby(cells, sort=True).agg(
+            lambda v: ", ".join(v.astype(str))
+        )
+    elif reducer == "mode":
+        pairs = pd.DataFrame({"cell": cells, "value": values}).dropna()
+        freq = pairs.groupby(["cell", "value"]).size().reset_index(name="n")
+        freq = freq[freq["n"] == freq.groupby("cell")["n"].transform("max")]
+        labels = freq.groupby("cell", sort=True)["value"].agg(
+            lambda v: ", ".join(map(str, v))
         )
+    else:
+        raise ValueError(f"Unsupported reducer: {reducer}")
+    return labels.index.values, labels.values
+
+
+def encode_categories(labels):
+    """
+    Integer codes (from 1, in order of first appearance) for category labels
+    and the array of distinct labels, where code i maps to classes[i - 1].
+    """
+    codes, classes = pd.factorize(pd.Series(labels, dtype=object), sort=False)
+    return codes.astype(np.float64) + 1, np.asarray(classes, dtype=object)
 
-    grid["raster_val"] = None
-    if reducer in ["first", "last", "mode", "concat"]:
-        grid["description"] = None
-
-    category_mapping = {}
-    category_counter = 1
-
-    for idx, cell in grid.iterrows():
-        intersecting = vector_data[vector_data.intersects(cell.geometry)]
-        if not intersecting.empty:
-            values = intersecting[attribute]
-            val = None
-            if reducer == "count":
-                val = len(values)
-            elif reducer == "density":
-                area = cell.geometry.area / 1e6
-                val = len(values) / area if area > 0 else 0
-            elif reducer == "sum":
-                val = values.sum()
-            elif reducer == "mean":
-                val = values.mean()
-            elif reducer == "min":
-                val = values.min()
-            elif reducer == "max":
-                val = values.max()
-            elif reducer in ["mode", "first", "last", "concat"]:
-                if reducer == "mode":
-                    mode_vals = values.mode()
-                    val_str = (
-                        ", ".join(map(str, mode_vals)) if not mode_vals.empty else None
-                    )
-                elif reducer == "first":
-                    val_str = values.iloc[0]
-                elif reducer == "last":
-                    val_str = values.iloc[-1]
-                elif reducer == "concat":
-                    val_str = ", ".join(values.astype(str))
-
-                if val_str not in category_mapping:
-                    category_mapping[val_str] = category_counter
-                    category_counter += 1
-                val = category_mapping[val_str]
-                grid.at[idx, "description"] = val_str
-
-            grid.at[idx, "raster_val"] = val
-
-    return grid
-
-
-def convert_to_raster(grid, grid_size, output_raster) -> str:
-    bounds = grid.total_bounds
-    minx, miny, maxx, maxy = bounds
-
-    cols = int((maxx - minx) / grid_size)
-    rows = int((maxy - miny) / grid_size)
-    transform = from_origin(minx, maxy, grid_size, grid_size)
-
-    raster_data = np.full((rows, cols), np.nan)
-    category_descriptions = {}
-
-    for _, row in grid.iterrows():
-        centroid = row.geometry.centroid
-        col = int((centroid.x - minx) / grid_size)
-        row_idx = int((maxy - centroid.y) / grid_size)
-        value = row["raster_val"]
-
-        if pd.notna(value):
-            raster_data[row_idx, col] = int(value)
-            if "description" in grid.columns and pd.notna(row.get("description")):
-                category_descriptions[int(value)] = row["description"]
 
+def category_dtype(n_classes):
+    """Smallest unsigned integer dtype holding codes 1..n_classes (0 = nodata)."""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n_classes <= np.iinfo(dtype).max:
+            return dtype
+    raise ValueError(f"Too many categories for a raster: {n_classes}")
+
+
+def convert_to_raster(
+    raster_data, category_classes, transform, crs, output_raster
+) -> str:
+    """
+    Write the grid as a GeoTIFF. Categorical grids (category_classes given)
+    are stored as the narrowest unsigned integer type with 0 as nodata and a
+    raster attribute table; numeric grids as float32 with NODATA.
+    """
+    nrows, ncols = raster_data.shape
     metadata = {
         "driver": "GTiff",
-        "height": rows,
-        "width": cols,
+        "height": nrows,
+        "width": ncols,
         "count": 1,
-        "dtype": rasterio.uint8,
-        "crs": grid.crs,
+        "crs": crs,
         "transform": transform,
     }
+    if category_classes is not None:
+        dtype = category_dtype(len(category_classes))
+        raster_data = np.nan_to_num(raster_data, nan=0).astype(dtype)
+        metadata.update(dtype=dtype, nodata=0)
+    else:
+        raster_data = np.where(np.isnan(raster_data), NODATA, raster_data)
+        raster_data = raster_data.astype(np.float32)
+        metadata.update(dtype=rasterio.float32, nodata=NODATA)
 
     with rasterio.open(output_raster, "w", **metadata) as dst:
         dst.write(raster_data, 1)
-        dst.update_tags(**{"Category_Descriptions": str(category_descriptions)})
 
-    _add_rat(output_raster, category_descriptions)
+    if category_classes is not None:
+        _add_rat(output_raster, category_classes)
     return output_raster
 
 
-def _add_rat(file_path, category_descriptions):
+def _add_rat(file_path, category_classes):
     ds = gdal.Open(file_path, gdalconst.GA_Update)
     band = ds.GetRasterBand(1)
     rat = gdal.RasterAttributeTable()
     rat.CreateColumn("Value", gdalconst.GFT_Integer, gdalconst.GFU_Generic)
     rat.CreateColumn("Class", gdalconst.GFT_String, gdalconst.GFU_Name)
 
-    for idx, (value, label) in enumerate(category_descriptions.items()):
-        rat.SetValueAsInt(idx, 0, value)
-        rat.SetValueAsString(idx, 1, label)
+    # Whole columns at once instead of one SetValue call per row
+    rat.SetRowCount(len(category_classes))
+    rat.WriteArray(np.arange(1, len(category_classes) + 1, dtype=np.int32), 0)
+    rat.WriteArray(
+        np.array([str(c).encode("utf-8") for c in category_classes], dtype=bytes), 1
+    )
 
     band.SetDefaultRAT(rat)
     band.SetMetadata({"LAYER_TYPE": "thematic"})
@@ -178,11 +330,56 @@ def reduce_to_image(
         if gdf.crs.to_epsg() != 7755:
             gdf = gdf.to_crs(epsg=7755)
 
-        grid = create_grid(gdf, grid_size)
-        grid = apply_reducer(grid, gdf, attribute, reducer)
+        if attribute not in gdf.columns:
+            raise ValueError(f"Attribute '{attribute}' not found in vector data.")
+        is_numeric = np.issubdtype(gdf[attribute].dtype, np.number)
+        if reducer in ["min", "max", "sum", "mean"] and not is_numeric:
+            raise ValueError(
+                f"Reducer '{reducer}' can only be applied to numeric attributes."
+            )
+
+        # Implicit grid: only the output array is allocated, never cell polygons
+        minx, top, ncols, nrows = grid_shape(gdf, grid_size)
+        transform = from_origin(minx, top, grid_size, grid_size)
+        grid = (grid_size, minx, top, ncols, nrows)
+        raster_data = np.full(nrows * ncols, np.nan)
+        category_classes = None
+
+        if reducer in ["count", "density", "sum", "mean"]:
+            # count and density ignore the attribute's values, which may be ids
+            values = None
+            if reducer in ["sum", "mean"]:
+                values = gdf[attribute].to_numpy(dtype=np.float64, na_value=np.nan)
+            raster_data = reduce_numeric(gdf, values, reducer, *grid)
+        elif reducer in ["min", "max", "first", "last"]:
+            if reducer in ["min", "max"]:
+                values = gdf[attribute].to_numpy(dtype=np.float64, na_value=np.nan)
+                key = values if reducer == "max" else -values
+            else:
+                index = np.arange(len(gdf), dtype=np.float64)
+                key = index if reducer == "last" else -index
+            winner = select_feature(gdf, key, *grid)
+            cells = np.flatnonzero(winner >= 0)
+            picked = gdf[attribute].values[winner[cells]]
+            if reducer in ["min", "max"]:
+                raster_data[cells] = picked
+            else:
+                raster_data[cells], category_classes = encode_categories(picked)
+        elif reducer in ["mode", "concat"]:
+            features, cells = grid_cells(gdf, *grid)
+            cell_ids, labels = apply_reducer(features, cells, gdf, attribute, reducer)
+            raster_data[cell_ids], category_classes = encode_categories(labels)
+        else:
+            raise ValueError(f"Unsupported reducer: {reducer}")
 
         temp_raster = "temp_output.tif"
-        cog_path = convert_to_raster(grid, grid_size, temp_raster)
+        cog_path = convert_to_raster(
+            raster_data.reshape(nrows, ncols),
+            category_classes,
+            transform,
+            gdf.crs,
+            temp_raster,
+        )
 
         # Save COG using external utility
         if store_artifact:
@@ -1,7 +1,8 @@
-import io
 import geopandas as gpd
 from common.minio_ops import connect_minio, get_bucket_name
 from common.save_feature_artifact import save_feature
+from common.spatial_clip import clip_to_mask
+from common.vector_io import read_vector
 
 
 def bbox_clip_feature(
@@ -10,9 +11,10 @@ def bbox_clip_feature(
     clip_vector_path: str,
     store_artifact: str,
     file_path: str = None,
+    workers: int = 1,
 ) -> dict:
     """
-    Clip a target GeoDataFrame with a local GeoJSON (clip layer). Optionally upload the clipped result back to MinIO or save locally.In editor it will be renamed as bbox-vector-clip.
+    Clip a target GeoDataFrame with a local GeoJSON (clip layer). Optionally upload the clipped result back to MinIO or save locally. Only target features whose bbox meets the clip layer are read, features fully inside it are kept without any geometry intersection and only those crossing its boundary are intersected, in parallel chunks when workers is above 1.In editor it will be renamed as bbox-vector-clip.
     Parameters
     ----------
     config : str (Reactflow will ignore this parameter)
@@ -20,19 +22,21 @@ def bbox_clip_feature(
     clip_vector_path : str (Reactflow will translate it as input)
     store_artifact : str (Reactflow will ignore this parameter)
     file_path : str (Reactflow will ignore this parameter)
+    workers : int (Reactflow will ignore this parameter)
     """
 
     client = connect_minio(config)
     bucket_name = get_bucket_name(config)
 
     try:
-        # Fetch target GeoDataFrame from MinIO
-        with client.get_object(bucket_name, target_artifact_url) as target_response:
-            target_gdf = gpd.read_file(io.BytesIO(target_response.read()))
-
         # Read clip GeoDataFrame from local file path
         clip_gdf = gpd.read_file(clip_vector_path)
 
+        # Fetch the target features within the clip layer's bbox from MinIO
+        target_gdf = read_vector(
+            client, bucket_name, target_artifact_url, bbox=clip_gdf
+        )
+
         if not isinstance(target_gdf, gpd.GeoDataFrame) or not isinstance(
             clip_gdf, gpd.GeoDataFrame
         ):
@@ -43,7 +47,12 @@ def bbox_clip_feature(
             clip_gdf = clip_gdf.to_crs(target_gdf.crs)
 
         # Perform clipping
-        clipped_data = gpd.clip(target_gdf, clip_gdf)
+        clipped_data, stats = clip_to_mask(target_gdf, clip_gdf, workers=workers)
+        print(
+            f"[INFO] Clipped {stats['candidates']} candidate features "
+            f"({stats['inside']} inside, {stats['boundary']} on the boundary) "
+            f"in {stats['seconds']:.2f}s"
+        )
 
         # Save clipped output
         if store_artifact:
@@ -2,6 +2,8 @@ import io
 import geopandas as gpd
 from common.minio_ops import connect_minio, get_bucket_name
 from common.save_feature_artifact import save_feature
+from common.spatial_clip import clip_to_mask
+from common.vector_io import read_vector
 
 
 def make_clip(
@@ -10,9 +12,10 @@ def make_clip(
     clip_artifact_url: str,
     store_artifact: str,
     file_path: str = None,
+    workers: int = 1,
 ) -> dict:
     """
-    Clip a target GeoDataFrame with another GeoDataFrame (clip layer). Optionally upload the clipped result back to MinIO or save locally.In editor it will be renamed as clip-vector.
+    Clip a target GeoDataFrame with another GeoDataFrame (clip layer). Optionally upload the clipped result back to MinIO or save locally. Only target features whose bbox meets the clip layer are read, features fully inside it are kept without any geometry intersection and only those crossing its boundary are intersected, in parallel chunks when workers is above 1.In editor it will be renamed as clip-vector.
     Parameters
     ----------
     config : str (Reactflow will ignore this parameter)
@@ -20,18 +23,20 @@ def make_clip(
     clip_artifact_url : str (Reactflow will take it from the previous step)
     store_artifact : str (Reactflow will ignore this parameter)
     file_path : str (Reactflow will ignore this parameter)
+    workers : int (Reactflow will ignore this parameter)
     """
 
     client = connect_minio(config)
     bucket_name = get_bucket_name(config)
 
     try:
-        with client.get_object(bucket_name, target_artifact_url) as target_response:
-            target_gdf = gpd.read_file(io.BytesIO(target_response.read()))
-
         with client.get_object(bucket_name, clip_artifact_url) as clip_response:
             clip_gdf = gpd.read_file(io.BytesIO(clip_response.read()))
 
+        target_gdf = read_vector(
+            client, bucket_name, target_artifact_url, bbox=clip_gdf
+        )
+
         if not isinstance(target_gdf, gpd.GeoDataFrame) or not isinstance(
             clip_gdf, gpd.GeoDataFrame
         ):
@@ -42,7 +47,12 @@ def make_clip(
                 "CRS mismatch: Target and Clip GeoDataFrames must have the same CRS."
             )
 
-        clipped_data = gpd.clip(target_gdf, clip_gdf)
+        clipped_data, stats = clip_to_mask(target_gdf, clip_gdf, workers=workers)
+        print(
+            f"[INFO] Clipped {stats['candidates']} candidate features "
+            f"({stats['inside']} inside, {stats['boundary']} on the boundary) "
+            f"in {stats['seconds']:.2f}s"
+        )
 
         if store_artifact:
             save_feature(
@@ -1,14 +1,107 @@
 import io
+import uuid
 import warnings
 import numpy as np
+import pandas as pd
 import geopandas as gpd
-from sklearn.cluster import KMeans
-from shapely.geometry import Point
+import shapely
+from sklearn.cluster import DBSCAN, HDBSCAN, KMeans, MiniBatchKMeans
 from common.minio_ops import connect_minio, get_bucket_name
 from common.save_feature_artifact import save_feature
+from common.vector_io import companion_path
+from common.geometry_measures import to_crs
 
 warnings.filterwarnings("ignore")
 
+CLUSTER_METHODS = ["kmeans", "minibatch_kmeans", "dbscan", "hdbscan"]
+# Mean Earth radius (m), converts metre distances to haversine radians
+EARTH_RADIUS = 6371008.8
+
+
+def cluster_labels(
+    coords,
+    method="kmeans",
+    n_clusters=20,
+    batch_size=4096,
+    eps=None,
+    min_samples=5,
+    min_cluster_size=5,
+    haversine=False,
+) -> np.ndarray:
+    """
+    Cluster label of every (x, y) coordinate; -1 marks DBSCAN/HDBSCAN noise.
+    With `haversine` the coordinates are lon/lat degrees and density based
+    methods search a BallTree on great-circle distances, with `eps` in metres.
+    """
+    if method in ("kmeans", "minibatch_kmeans"):
+        n_clusters = min(int(n_clusters), len(coords))
+        if method == "kmeans":
+            model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        else:
+            model = MiniBatchKMeans(
+                n_clusters=n_clusters,
+                batch_size=int(batch_size),
+                random_state=42,
+                n_init=3,
+            )
+        return model.fit_predict(coords)
+
+    if method not in ("dbscan", "hdbscan"):
+        raise ValueError(
+            f"Unsupported clustering method: {method}. Use any of {CLUSTER_METHODS}."
+        )
+    if haversine:
+        coords = np.radians(coords[:, ::-1])
+        options = {"metric": "haversine", "algorithm": "ball_tree"}
+    else:
+        options = {"metric": "euclidean", "algorithm": "kd_tree"}
+
+    if method == "dbscan":
+        if eps is None:
+            raise ValueError("DBSCAN needs eps, the neighbourhood distance.")
+        eps = float(eps) / EARTH_RADIUS if haversine else float(eps)
+        model = DBSCAN(eps=eps, min_samples=int(min_samples), n_jobs=-1, **options)
+    else:
+        model = HDBSCAN(
+            min_cluster_size=int(min_cluster_size),
+            min_samples=int(min_samples),
+            n_jobs=-1,
+            **options,
+        )
+    return model.fit_predict(coords)
+
+
+def cluster_summary(gdf, coords, labels, crs=None) -> gpd.GeoDataFrame:
+    """
+    One row per cluster (noise excluded): its convex hull, member count,
+    centre and the mean of every numeric attribute. `coords` are in `crs`;
+    centres are averaged there and reported in lon/lat, the CRS artifacts
+    are saved in.
+    """
+    member = labels >= 0
+    clusters, codes = np.unique(labels[member], return_inverse=True)
+    codes = codes.ravel()
+    order = np.argsort(codes, kind="stable")
+    hulls = shapely.convex_hull(
+        shapely.multipoints(coords[member][order], indices=codes[order])
+    )
+    counts = np.bincount(codes, minlength=len(clusters))
+    summary = pd.DataFrame({"cluster": clusters, "count": counts})
+    centres = shapely.points(
+        np.bincount(codes, coords[member, 0]) / counts,
+        np.bincount(codes, coords[member, 1]) / counts,
+    )
+    if crs is not None:
+        centres = to_crs(centres, crs, "EPSG:4326")
+    centres = shapely.get_coordinates(centres)
+    summary["center_lon"] = centres[:, 0]
+    summary["center_lat"] = centres[:, 1]
+    numeric = gdf.drop(columns=["cluster", "geometry"]).select_dtypes("number")
+    if numeric.columns.size:
+        means = numeric[member].groupby(codes).mean().add_prefix("mean_")
+        summary = pd.concat([summary, means.reset_index(drop=True)], axis=1)
+    return gpd.GeoDataFrame(summary, geometry=hulls, crs=crs)
+
 
 def generate_clusters(
     config: str,
@@ -16,9 +109,16 @@ def generate_clusters(
     store_artifact: str,
     n_clusters: int = 20,
     file_path: str = None,
+    method: str = "kmeans",
+    batch_size: int = 4096,
+    eps: float = None,
+    min_samples: int = 5,
+    min_cluster_size: int = 5,
+    metric_crs: str = None,
+    summary: bool = False,
 ) -> dict:
     """
-    Perform KMeans clustering on point-based vector data with default cluster count as 20 and adds attribute to the input vector denoting the cluster number. Optionally upload the clustered result to MinIO or save locally.In editor it will be renamed as kmeans-clustering.
+    Perform clustering on point-based vector data and adds attribute to the input vector denoting the cluster number. method kmeans (default cluster count 20) and minibatch_kmeans (for large inputs, using batch_size) form n_clusters clusters; dbscan (needs eps, the neighbourhood distance) and hdbscan (uses min_cluster_size) find dense groups and mark the rest as noise with cluster -1, using min_samples neighbours. Distances are great-circle metres for data in a geographic CRS, or measured in metric_crs when given. With summary True a second artifact <file_path>_clusters.geojson holds each cluster's convex hull, size, lon/lat centre and attribute means. Optionally upload the clustered result to MinIO or save locally.In editor it will be renamed as kmeans-clustering.
     Parameters
     ----------
     config : str (Reactflow will ignore this parameter)
@@ -26,6 +126,13 @@ def generate_clusters(
     store_artifact : str (Reactflow will ignore this parameter)
     n_clusters : int (Reactflow will translate it as input, This parameter will be optional)
     file_path : str (Reactflow will ignore this parameter)
+    method : enum [kmeans, minibatch_kmeans, dbscan, hdbscan] (Reactflow will translate it as input, This parameter will be optional)
+    batch_size : int (Reactflow will translate it as input, This parameter will be optional)
+    eps : float (Reactflow will translate it as input, This parameter will be optional)
+    min_samples : int (Reactflow will translate it as input, This parameter will be optional)
+    min_cluster_size : int (Reactflow will translate it as input, This parameter will be optional)
+    metric_crs : str (Reactflow will translate it as input, This parameter will be optional)
+    summary : enum [True, False] (Reactflow will translate it as input, This parameter will be optional)
     """
 
     client = connect_minio(config)
@@ -44,23 +151,41 @@ def generate_clusters(
         gdf = gpd.GeoDataFrame(gdf, crs=gdf.crs or "EPSG:4326")
 
         # --- Step 2: Compute centroids for clustering ---
-        centroids = gdf.geometry.centroid
-        coords = np.array([[geom.x, geom.y] for geom in centroids])
+        work = gdf.geometry.to_crs(metric_crs) if metric_crs else gdf.geometry
+        coords = shapely.get_coordinates(shapely.centroid(work.values))
+        haversine = metric_crs is None and bool(work.crs and work.crs.is_geographic)
 
         # --- Step 3: Perform clustering ---
-        n_clusters = min(n_clusters, len(coords))
-        gdf["cluster"] = KMeans(
-            n_clusters=n_clusters, random_state=42, n_init=10
-        ).fit_predict(coords)
+        labels = cluster_labels(
+            coords,
+            method=method,
+            n_clusters=n_clusters,
+            batch_size=batch_size,
+            eps=eps,
+            min_samples=min_samples,
+            min_cluster_size=min_cluster_size,
+            haversine=haversine,
+        )
+        gdf["cluster"] = labels
 
         # --- Step 4: Save clustered output ---
         if store_artifact:
+            # Name the artifact here so the summary always has a base name
+            file_path = file_path or f"{uuid.uuid4()}.geojson"
             save_feature(
                 store_artifact=store_artifact,
                 gdf=gdf,
                 file_path=file_path,
                 config_path=config,
             )
+            if str(summary).lower() == "true":
+                summary_gdf = cluster_summary(gdf, coords, labels, crs=work.crs)
+                save_feature(
+                    store_artifact=store_artifact,
+                    gdf=summary_gdf,
+                    file_path=companion_path(file_path, "_clusters"),
+                    config_path=config,
+                )
         else:
             print(
                 "Data not saved. Set store_artifact to 'minio' or 'local' to save the data."
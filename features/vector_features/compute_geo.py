@@ -1,6 +1,7 @@
 import geopandas as gpd
 from common.minio_ops import connect_minio, get_bucket_name
 from common.save_feature_artifact import save_feature
+from common.geometry_measures import geometry_measures
 import io
 
 
@@ -9,15 +10,21 @@ def compute_geometry_measures(
     artifact_url: str,
     store_artifact: str,
     file_path: str = None,
+    mode: str = "planar",
+    extra_measures: bool = False,
+    workers: int = 1,
 ) -> None:
     """
-    Reads geospatial data from MinIO, computes geometry measures, and optionally saves the processed data back to MinIO or save locally.In editor it will be renamed as compute-geometry.
+    Reads geospatial data from MinIO, computes geometry measures, and optionally saves the processed data back to MinIO or save locally. Lines get length_m and polygons area_sq_m and perimeter_m, either planar in EPSG:7755 or geodesic on the WGS84 ellipsoid (mode geodesic), which stays accurate for layers spanning several zones. With extra_measures the same pass adds the lon/lat centroid and bbox, the vertex count, compactness (4 pi area / perimeter^2) and the ratio of area to convex hull area. Large layers are measured in chunks, in parallel when workers is above 1.In editor it will be renamed as compute-geometry.
     Parameters
     ----------
     config : str (Reactflow will ignore this parameter)
     artifact_url : str (Reactflow will take it from the previous step)
     store_artifact : str (Reactflow will ignore this parameter)
     file_path : str (Reactflow will ignore this parameter)
+    mode : enum [planar, geodesic] (Reactflow will translate it as input, This parameter will be optional)
+    extra_measures : bool (Reactflow will translate it as input, This parameter will be optional)
+    workers : int (Reactflow will ignore this parameter)
     """
     client = connect_minio(config)
     bucket_name = get_bucket_name(config)
@@ -30,23 +37,20 @@ def compute_geometry_measures(
             # print("Warning: No CRS found! Assuming EPSG:4326 (WGS 84).")
             gdf.set_crs(epsg=4326, inplace=True)
 
-        gdf = gdf.to_crs(epsg=7755)
-        # print("Reprojected to EPSG:7755.")
-
-        geometry_type = gdf.geometry.iloc[0].geom_type
-        # print(f"Geometry type identified: {geometry_type}")
+        measures = geometry_measures(
+            gdf.geometry,
+            gdf.crs,
+            mode=mode,
+            metric_crs="EPSG:7755",
+            extra=bool(extra_measures),
+            workers=workers,
+        )
 
-        if geometry_type == "Point":
+        # Measures that apply to none of the geometry types are left out
+        measures = measures.dropna(axis=1, how="all")
+        if measures.empty:
             print("Geometry is Point. No area or perimeter computation needed.")
-        elif geometry_type in ["LineString", "MultiLineString"]:
-            gdf["length_m"] = gdf.length
-            # print("Geometry is Line or MultiLine. Computed length in meters.")
-        elif geometry_type in ["Polygon", "MultiPolygon"]:
-            gdf["area_sq_m"] = gdf.area
-            gdf["perimeter_m"] = gdf.length
-            # print("Geometry is Polygon. Computed area and perimeter in meters.")
-        else:
-            print("Unsupported geometry type.")
+        gdf = gdf.assign(**measures)
     except Exception as e:
         raise e
 
@@ -2,6 +2,7 @@ import geopandas as gpd
 from common.minio_ops import connect_minio, get_bucket_name
 from common.save_feature_artifact import save_feature
 import io
+from common.spatial_partition import partitioned_overlay
 
 
 def make_intersection(
@@ -10,9 +11,11 @@ def make_intersection(
     right_feature: str,
     store_artifact: str,
     file_path: str = None,
+    partitions: int = 1,
+    workers: int = None,
 ) -> None:
     """
-    Function to intersect two geodataframes and save the intersected data to minio or locally.In editor it will be renamed as create-intersection.
+    Function to intersect two geodataframes and save the intersected data to minio or locally. With partitions above 1 the left layer is split into that many spatially compact (Hilbert curve) partitions that are intersected in parallel, each against only the right features near it, and the time spent per partition is reported.In editor it will be renamed as create-intersection.
     Parameters
     ----------
     config : str (Reactflow will ignore this parameter)
@@ -20,6 +23,8 @@ def make_intersection(
     right_feature : str (Reactflow will take it from the previous step)
     store_artifact : str (Reactflow will ignore this parameter)
     file_path : str (Reactflow will ignore this parameter)
+    partitions : int (Reactflow will translate it as input, This parameter will be optional)
+    workers : int (Reactflow will ignore this parameter)
     """
 
     client = connect_minio(config)
@@ -36,7 +41,21 @@ def make_intersection(
         print(e)
 
     try:
-        intersected_data = data_1.overlay(data_2, how="intersection")
+        if int(partitions) > 1:
+            intersected_data, timings = partitioned_overlay(
+                data_1,
+                data_2,
+                how="intersection",
+                partitions=int(partitions),
+                workers=workers,
+            )
+            for index, n_left, n_right, n_out, seconds in timings:
+                print(
+                    f"[INFO] Partition {index}: {n_left} x {n_right} features "
+                    f"-> {n_out} in {seconds:.2f}s"
+                )
+        else:
+            intersected_data = data_1.overlay(data_2, how="intersection")
     except Exception as e:
         raise e
 
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import warnings
+import numpy as np
+from pyproj import CRS
+
+from common.minio_ops import connect_minio, get_bucket_name
+from common.save_csv_artifact import save_csv_artifact
+from common.road_graph import snap_to_edges, od_csv_chunks
+from common.routing_graph_cache import load_routing_graph, read_locations
+
+warnings.filterwarnings("ignore")
+
+
+def compute_od_matrix(
+    config: str,
+    artifact_url: str,
+    origins_artifact_url: str,
+    destinations_artifact_url: str,
+    store_artifact: str,
+    file_path: str = None,
+    metric_crs: str = None,
+    cutoff: float = None,
+    origin_id_field: str = None,
+    destination_id_field: str = None,
+    snap_to: str = "node",
+    workers: int = None,
+    decimals: int = None,
+) -> str:
+    """
+    Function to compute the road network distance from every origin to every destination (e.g. schools x households) and write it as a long-format CSV with origin_id, destination_id and distance columns. Distances are measured in the road layer's CRS, or in metric_crs when given (e.g. EPSG:7755 for metres). With cutoff only pairs within that distance are written; unreachable pairs are always left out. Polygon inputs are represented by a point inside them. Origins are processed in parallel across CPU cores. decimals rounds road vertex coordinates before joining them into nodes; use the same value as build-routing-graph to reuse its prebuilt graph.In editor it will be renamed as create-od-matrix.
+    Parameters
+    ----------
+    config : str (Reactflow will ignore this parameter)
+    artifact_url : str (Reactflow will take it from the previous step)
+    origins_artifact_url : str (Reactflow will take it from the previous step)
+    destinations_artifact_url : str (Reactflow will take it from the previous step)
+    store_artifact : str (Reactflow will ignore this parameter)
+    file_path : str (Reactflow will ignore this parameter)
+    metric_crs : str (Reactflow will translate it as input, This parameter will be optional)
+    cutoff : float (Reactflow will translate it as input, This parameter will be optional)
+    origin_id_field : str (Reactflow will translate it as input, This parameter will be optional)
+    destination_id_field : str (Reactflow will translate it as input, This parameter will be optional)
+    snap_to : enum [node, edge] (Reactflow will translate it as input, This parameter will be optional)
+    workers : int (Reactflow will ignore this parameter)
+    decimals : int (Reactflow will translate it as input, This parameter will be optional)
+    """
+    if snap_to not in ("node", "edge"):
+        raise ValueError(f"Unsupported snap_to: {snap_to}. Use node or edge.")
+
+    client = connect_minio(config)
+    bucket_name = get_bucket_name(config)
+
+    try:
+        graph, node_coords, kd_tree, road_crs, _ = load_routing_graph(
+            client,
+            bucket_name,
+            artifact_url,
+            decimals=None if decimals is None else int(decimals),
+            metric_crs=metric_crs,
+        )
+        road_crs = CRS.from_user_input(road_crs)
+        origin_xy, origin_ids = read_locations(
+            client, bucket_name, origins_artifact_url, road_crs, origin_id_field
+        )
+        dest_xy, dest_ids = read_locations(
+            client,
+            bucket_name,
+            destinations_artifact_url,
+            road_crs,
+            destination_id_field,
+        )
+    except Exception as e:
+        raise RuntimeError(f"[ERROR] Failed to load OD matrix inputs: {e}")
+
+    # Snap origins and destinations together so shared edges stay consistent
+    xy = np.vstack((origin_xy, dest_xy))
+    if snap_to == "edge":
+        graph, _, nodes = snap_to_edges(graph, node_coords, xy, kd_tree=kd_tree)
+    else:
+        _, nodes = kd_tree.query(xy)
+    origin_nodes, dest_nodes = nodes[: len(origin_xy)], nodes[len(origin_xy) :]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        local_csv = os.path.join(tmpdir, "od_matrix.csv")
+        n_pairs = 0
+        try:
+            with open(local_csv, "w", newline="") as f:
+                f.write("origin_id,destination_id,distance\n")
+                for lines in od_csv_chunks(
+                    graph,
+                    origin_nodes,
+                    dest_nodes,
+                    origin_ids,
+                    dest_ids,
+                    cutoff=cutoff,
+                    workers=workers,
+                ):
+                    f.write(lines)
+                    n_pairs += lines.count("\n")
+        except Exception as e:
+            raise RuntimeError(f"[ERROR] OD matrix computation failed: {e}")
+
+        print(f"Computed {n_pairs} origin-destination pairs")
+        file_path = save_csv_artifact(
+            config=config,
+            local_path=local_csv,
+            file_path=file_path,
+            store_artifact=store_artifact,
+        )
+        return file_path
@@ -2,14 +2,16 @@ import os
 import io
 import uuid
 import geopandas as gpd
-import networkx as nx
-from shapely.geometry import Point, LineString
-from scipy.spatial import KDTree
-from networkx.algorithms.approximation import traveling_salesman_problem
+from pyproj import CRS
+from shapely.geometry import LineString
 # from tqdm import tqdm
 
 from common.minio_ops import connect_minio, get_bucket_name
 from common.save_feature_artifact import save_feature
+from common.vector_io import companion_path
+from common.road_graph import snap_to_edges, stop_distance_matrix, shortest_path
+from common.route_optimizer import optimize_route, path_length
+from common.routing_graph_cache import load_routing_graph
 
 
 def compute_optimal_route(
@@ -18,9 +20,16 @@ def compute_optimal_route(
     points_file: str,  # Local file path to user's point data
     store_artifact: str,  # Whether to upload the output to MinIO
     file_path: str = None,  # Base name for your route .pkl in MinIO
+    metric_crs: str = None,  # CRS used to measure road lengths, e.g. EPSG:7755
+    mode: str = "cycle",  # cycle returns to the start, open ends elsewhere
+    start_index: int = None,  # Row of the points file to start from
+    end_index: int = None,  # Row of the points file to finish at (open mode)
+    time_budget: float = 10.0,  # Seconds spent improving the tour
+    snap_to: str = "node",  # Snap stops to the nearest node or edge
+    decimals: int = None,  # Round road vertices before joining them
 ) -> dict:
     """
-    Function to compute the optimal route through a road network for a set of input points.In editor it will be renamed as create-optimal-route.
+    Function to compute the optimal route through a road network for a set of input points. Road lengths are measured in the road layer's CRS, or in metric_crs when given (use a projected CRS such as EPSG:7755 for roads in EPSG:4326). The visiting order starts from a nearest-neighbour tour improved with 2-opt and Or-opt moves for up to time_budget seconds; mode cycle returns to the start point while mode open ends at end_index (or wherever is shortest). start_index and end_index are row numbers in the points file. snap_to edge places each stop on its nearest road edge instead of the nearest road vertex, which keeps routes exact on long road segments. decimals rounds road vertex coordinates before joining them into nodes; use the same value as build-routing-graph to reuse its prebuilt graph.In editor it will be renamed as create-optimal-route.
     Parameters
     ----------
     config : str (Reactflow will ignore this parameter)
@@ -28,6 +37,13 @@ def compute_optimal_route(
     points_file : str (Reactflow will translate it as input)
     store_artifact : str (Reactflow will ignore this parameter)
     file_path : str (Reactflow will ignore this parameter)
+    metric_crs : str (Reactflow will translate it as input, This parameter will be optional)
+    mode : enum [cycle, open] (Reactflow will translate it as input, This parameter will be optional)
+    start_index : int (Reactflow will translate it as input, This parameter will be optional)
+    end_index : int (Reactflow will translate it as input, This parameter will be optional)
+    time_budget : float (Reactflow will translate it as input, This parameter will be optional)
+    snap_to : enum [node, edge] (Reactflow will translate it as input, This parameter will be optional)
+    decimals : int (Reactflow will translate it as input, This parameter will be optional)
     """
 
     # 1. Connect to MinIO
@@ -35,45 +51,29 @@ def compute_optimal_route(
     bucket_name = get_bucket_name(config)
     # print("[INFO] Connected to MinIO successfully.")
 
-    # 2. Download the road network (pickled GeoDataFrame) from MinIO
-    import io
-
+    # 2-3. Load the prebuilt routing graph (CSR arrays, node coordinates and
+    # KD-tree) for this road layer, building and caching it on first use
     try:
-        with minio_client.get_object(
-            bucket_name=bucket_name, object_name=artifact_url
-        ) as response:
-            road_gdf = gpd.read_file(io.BytesIO(response.read()))
+        graph, node_coords, kd_tree, road_crs, _ = load_routing_graph(
+            minio_client,
+            bucket_name,
+            artifact_url,
+            decimals=None if decimals is None else int(decimals),
+            metric_crs=metric_crs,
+        )
         # print(f"[INFO] Road network artifact '{artifact_url}' loaded from MinIO.")
+    except ValueError:
+        raise
     except Exception as e:
         raise RuntimeError(
             f"[ERROR] Unable to download/load road artifact from MinIO: {e}"
         )
+    road_crs = CRS.from_user_input(road_crs)
 
-    # Explode multi-line geometries and remove empties
-    road_gdf = road_gdf.explode(ignore_index=True)
-    road_gdf = road_gdf[road_gdf.geometry.notna()]
-    if road_gdf.empty:
-        raise ValueError("[ERROR] Road GeoDataFrame is empty after filtering/explode.")
-
-    # If no CRS on road_gdf, assume EPSG:4326
-    if road_gdf.crs is None:
-        # print("[WARN] Road network has no CRS; assuming EPSG:4326.")
-        road_gdf.set_crs("EPSG:4326", inplace=True)
-
-    # 3. Build bounding box & construct a NetworkX graph
-    minx, miny, maxx, maxy = road_gdf.total_bounds
-    # print(f"[INFO] Road bounding box: ({minx}, {miny}, {maxx}, {maxy})")
-
-    G = nx.Graph()
-    for _, row in road_gdf.iterrows():
-        geom = row.geometry
-        if geom.geom_type == "LineString":
-            coords = list(geom.coords)
-            for i in range(len(coords) - 1):
-                node1, node2 = coords[i], coords[i + 1]
-                dist = Point(node1).distance(Point(node2))
-                G.add_edge(node1, node2, weight=dist)
-    # print(f"[INFO] Created graph with {G.number_of_nodes()} nodes and {G.number_of_edges()} edges.")
+    # Bounding box of the road vertices
+    minx, miny = node_coords.min(axis=0)
+    maxx, maxy = node_coords.max(axis=0)
+    # print(f"[INFO] Created graph with {graph.shape[0]} nodes and {graph.nnz // 2} edges.")
 
     # 4. Read local points file
     points_gdf = gpd.read_file(points_file)
@@ -86,10 +86,10 @@ def compute_optimal_route(
         points_gdf.set_crs("EPSG:7755", inplace=True)
 
     # Reproject points if needed
-    if road_gdf.crs != points_gdf.crs:
+    if road_crs != points_gdf.crs:
         # print("[WARN] CRS mismatch: reprojecting points to match road network CRS.")
         try:
-            points_gdf = points_gdf.to_crs(road_gdf.crs)
+            points_gdf = points_gdf.to_crs(road_crs)
         except Exception as reproj_err:
             raise ValueError(f"[ERROR] Could not reproject points: {reproj_err}")
 
@@ -102,83 +102,65 @@ def compute_optimal_route(
             "[ERROR] After filtering, no valid Point geometry remains in the points file."
         )
 
-    # 5. Snap each point to the nearest node in the graph
+    # 5. Snap all points at once, to the nearest node or onto the nearest edge
     import numpy as np
 
-    road_nodes_arr = list(G.nodes())
-    if not road_nodes_arr:
-        raise ValueError("[ERROR] The road graph has no nodes. Cannot proceed.")
-
-    kd_tree = KDTree(np.array(road_nodes_arr))
-
-    snapped_nodes = []
-    original_points = []
-    for idx, row in points_gdf.iterrows():
-        pt = row.geometry
-        x, y = pt.x, pt.y
-
-        # Check bounding
-        if not (minx <= x <= maxx and miny <= y <= maxy):
-            raise ValueError(
-                f"[ERROR] Point ({x},{y}) is outside the road bounding box."
-            )
-
-        _, nearest_idx = kd_tree.query([x, y])
-        snapped_node = tuple(road_nodes_arr[nearest_idx])
-        snapped_nodes.append(snapped_node)
-        original_points.append(pt)
+    original_points = list(points_gdf.geometry)
+    xy = np.column_stack((points_gdf.geometry.x, points_gdf.geometry.y))
+    outside = (xy[:, 0] < minx) | (xy[:, 0] > maxx)
+    outside |= (xy[:, 1] < miny) | (xy[:, 1] > maxy)
+    if outside.any():
+        x, y = xy[np.argmax(outside)]
+        raise ValueError(f"[ERROR] Point ({x},{y}) is outside the road bounding box.")
+
+    if snap_to == "edge":
+        graph, node_coords, snapped_nodes = snap_to_edges(
+            graph, node_coords, xy, kd_tree=kd_tree
+        )
+    elif snap_to == "node":
+        _, snapped_nodes = kd_tree.query(xy)
+    else:
+        raise ValueError(f"[ERROR] Unsupported snap_to: {snap_to}. Use node or edge.")
+    snapped_nodes = [int(node) for node in snapped_nodes]
 
     # print(f"[INFO] Snapped {len(snapped_nodes)} input points to the road network.")
 
-    # 6. Compute paths using A* instead of Dijkstra
-    node_count = len(snapped_nodes)
-    shortest_paths = {}
-
-    # Define a heuristic function for A* using Euclidean distance
-    heuristic = lambda u, v: Point(u).distance(Point(v))
-
-    for i in range(node_count):
-        for j in range(i + 1, node_count):
-            src = snapped_nodes[i]
-            dst = snapped_nodes[j]
-            try:
-                path = nx.astar_path(
-                    G, source=src, target=dst, heuristic=heuristic, weight="weight"
-                )
-                distance = nx.astar_path_length(
-                    G, source=src, target=dst, heuristic=heuristic, weight="weight"
-                )
-                shortest_paths[(i, j)] = {"path": path, "distance": distance}
-            except nx.NetworkXNoPath:
-                shortest_paths[(i, j)] = {"path": None, "distance": float("inf")}
-
-    # Build TSP graph
-    TSP_G = nx.Graph()
-    for (i, j), info in shortest_paths.items():
-        if info["path"] is not None:  # Only add edges if there's a valid path
-            TSP_G.add_edge(i, j, weight=info["distance"])
-
-    # Solve TSP
-    tsp_order = traveling_salesman_problem(TSP_G, cycle=True)
-    # print(f"[INFO] TSP visitation order (indices): {tsp_order}")
-
-    # 7. Reconstruct final route
+    # 6. Stop-to-stop network distances, one Dijkstra search per stop
+    distances = stop_distance_matrix(graph, snapped_nodes)
+
+    # Depots are given as rows of the points file; map them to stop positions
+    depots = []
+    for row in (start_index, end_index):
+        pos = -1 if row is None else points_gdf.index.get_indexer([int(row)])[0]
+        if row is not None and pos < 0:
+            raise ValueError(f"[ERROR] Point {row} is not a valid point of the file.")
+        depots.append(None if row is None else int(pos))
+
+    # Solve TSP: nearest-neighbour seed improved by 2-opt / Or-opt
+    tsp_order, history = optimize_route(
+        distances,
+        mode=mode,
+        start=depots[0],
+        end=depots[1],
+        time_budget=float(time_budget),
+    )
+    tour_length = path_length(tsp_order, distances)
+    for seconds, step, length in history:
+        print(f"[INFO] {seconds:8.3f}s {step:<7} tour length {length:.3f}")
+
+    # 7. Reconstruct final route, only for the legs the tour actually uses
     tsp_full_path = []
     for i in range(len(tsp_order) - 1):
         start_idx = tsp_order[i]
         end_idx = tsp_order[i + 1]
 
-        # Handle path retrieval based on the index order (maintain consistent key format)
-        if start_idx < end_idx:
-            pair_key = (start_idx, end_idx)
-        else:
-            pair_key = (end_idx, start_idx)
-
-        if pair_key in shortest_paths and shortest_paths[pair_key]["path"] is not None:
-            segment_path = shortest_paths[pair_key]["path"]
-            # If we need to reverse the path
-            if start_idx > end_idx:
-                segment_path = segment_path[::-1]
+        if np.isfinite(distances[start_idx, end_idx]):
+            segment_path = shortest_path(
+                graph,
+                snapped_nodes[start_idx],
+                snapped_nodes[end_idx],
+                distances[start_idx, end_idx],
+            )
 
             # Avoid duplicating nodes between segments
             if tsp_full_path and tsp_full_path[-1] == segment_path[0]:
@@ -191,14 +173,17 @@ def compute_optimal_route(
             "[ERROR] Could not construct a valid route through all points."
         )
 
-    route_line = LineString(tsp_full_path)
-    route_gdf = gpd.GeoDataFrame(geometry=[route_line], crs=road_gdf.crs)
+    route_line = LineString(node_coords[tsp_full_path])
+    route_gdf = gpd.GeoDataFrame(
+        {"length": [tour_length]}, geometry=[route_line], crs=road_crs
+    )
 
-    # 8. Create ordered points (skip last duplicate)
+    # 8. Create ordered points (skip the closing duplicate of a cycle)
+    visit_order = tsp_order[:-1] if mode == "cycle" else tsp_order
     visited_points = []
-    for rank, idx_val in enumerate(tsp_order[:-1], start=1):
+    for rank, idx_val in enumerate(visit_order, start=1):
         visited_points.append({"geometry": original_points[idx_val], "order": rank})
-    points_ordered_gdf = gpd.GeoDataFrame(visited_points, crs=road_gdf.crs)
+    points_ordered_gdf = gpd.GeoDataFrame(visited_points, crs=road_crs)
 
     # --------------------------------------------------------
     # 9. If store_artifact=local/minio, upload to MinIO or save locally as per user input
@@ -210,7 +195,7 @@ def compute_optimal_route(
             file_path=file_path,
             config_path=config,
         )
-        points_file_path = file_path.replace(".geojson", "_points.geojson")
+        points_file_path = companion_path(file_path, "_points")
         save_feature(
             store_artifact=store_artifact,
             gdf=points_ordered_gdf,
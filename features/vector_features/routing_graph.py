@@ -0,0 +1,38 @@
+from common.minio_ops import connect_minio, get_bucket_name
+from common.routing_graph_cache import load_routing_graph
+
+
+def build_routing_graph(
+    config: str,
+    artifact_url: str,
+    metric_crs: str = None,
+    decimals: int = None,
+) -> str:
+    """
+    Function to prebuild the routing graph of a road network and store it in MinIO, keyed by the road layer's ETag, so routing nodes load it directly instead of rebuilding it from GeoJSON. Road lengths are measured in metric_crs when given; decimals rounds vertex coordinates before joining them into nodes.In editor it will be renamed as build-routing-graph.
+    Parameters
+    ----------
+    config : str (Reactflow will ignore this parameter)
+    artifact_url : str (Reactflow will take it from the previous step)
+    metric_crs : str (Reactflow will translate it as input, This parameter will be optional)
+    decimals : int (Reactflow will translate it as input, This parameter will be optional)
+    """
+    client = connect_minio(config)
+    bucket_name = get_bucket_name(config)
+
+    try:
+        graph, _, _, _, cache_key = load_routing_graph(
+            client,
+            bucket_name,
+            artifact_url,
+            decimals=None if decimals is None else int(decimals),
+            metric_crs=metric_crs,
+        )
+    except Exception as e:
+        raise RuntimeError(f"[ERROR] Failed to build routing graph: {e}")
+
+    print(
+        f"Routing graph with {graph.shape[0]} nodes and {graph.nnz // 2} edges "
+        f"stored at {cache_key}"
+    )
+    return cache_key
@@ -0,0 +1,148 @@
+import uuid
+import warnings
+import numpy as np
+import geopandas as gpd
+from pyproj import CRS, Transformer
+
+from common.minio_ops import connect_minio, get_bucket_name
+from common.save_feature_artifact import save_feature
+from common.vector_io import companion_path
+from common.road_graph import snap_to_edges
+from common.routing_graph_cache import load_routing_graph, read_locations
+from common.service_area import parse_thresholds, service_areas, POLYGON_METHODS
+
+warnings.filterwarnings("ignore")
+
+
+def compute_service_area(
+    config: str,
+    artifact_url: str,
+    facilities_artifact_url: str,
+    thresholds: str,
+    store_artifact: str,
+    file_path: str = None,
+    metric_crs: str = None,
+    polygon_method: str = "buffer",
+    buffer_distance: float = 50.0,
+    concave_ratio: float = 0.3,
+    per_facility: bool = True,
+    facility_id_field: str = None,
+    include_edges: bool = True,
+    snap_to: str = "node",
+    workers: int = None,
+    decimals: int = None,
+) -> str:
+    """
+    Function to compute service areas (isochrones) around facility points on a road network for one or more distance thresholds, e.g. 500,1000,2000. Distances are measured in the road layer's CRS, or in metric_crs when given (e.g. EPSG:7755 for metres), which is also the CRS used for buffer_distance. Each area is the part of the network reachable within the threshold, turned into a polygon by buffering it (polygon_method buffer) or by a concave hull (polygon_method concave_hull, with concave_ratio between 0 and 1). With per_facility False the areas of all facilities are merged. When include_edges is True the reachable road pieces are saved next to the polygons as <file_path>_edges.geojson. decimals rounds road vertex coordinates before joining them into nodes; use the same value as build-routing-graph to reuse its prebuilt graph.In editor it will be renamed as create-service-area.
+    Parameters
+    ----------
+    config : str (Reactflow will ignore this parameter)
+    artifact_url : str (Reactflow will take it from the previous step)
+    facilities_artifact_url : str (Reactflow will take it from the previous step)
+    thresholds : str (Reactflow will translate it as input)
+    store_artifact : str (Reactflow will ignore this parameter)
+    file_path : str (Reactflow will ignore this parameter)
+    metric_crs : str (Reactflow will translate it as input, This parameter will be optional)
+    polygon_method : enum [buffer, concave_hull] (Reactflow will translate it as input, This parameter will be optional)
+    buffer_distance : float (Reactflow will translate it as input, This parameter will be optional)
+    concave_ratio : float (Reactflow will translate it as input, This parameter will be optional)
+    per_facility : enum [True, False] (Reactflow will translate it as input, This parameter will be optional)
+    facility_id_field : str (Reactflow will translate it as input, This parameter will be optional)
+    include_edges : enum [True, False] (Reactflow will translate it as input, This parameter will be optional)
+    snap_to : enum [node, edge] (Reactflow will translate it as input, This parameter will be optional)
+    workers : int (Reactflow will ignore this parameter)
+    decimals : int (Reactflow will translate it as input, This parameter will be optional)
+    """
+    threshold_values = parse_thresholds(thresholds)
+    if polygon_method not in POLYGON_METHODS:
+        raise ValueError(
+            f"Unsupported polygon method: {polygon_method}. Use any of {POLYGON_METHODS}."
+        )
+    if snap_to not in ("node", "edge"):
+        raise ValueError(f"Unsupported snap_to: {snap_to}. Use node or edge.")
+
+    client = connect_minio(config)
+    bucket_name = get_bucket_name(config)
+
+    try:
+        graph, node_coords, kd_tree, road_crs, _ = load_routing_graph(
+            client,
+            bucket_name,
+            artifact_url,
+            decimals=None if decimals is None else int(decimals),
+            metric_crs=metric_crs,
+        )
+        road_crs = CRS.from_user_input(road_crs)
+        facility_xy, facility_ids = read_locations(
+            client, bucket_name, facilities_artifact_url, road_crs, facility_id_field
+        )
+    except Exception as e:
+        raise RuntimeError(f"[ERROR] Failed to load service area inputs: {e}")
+
+    if snap_to == "edge":
+        graph, node_coords, facility_nodes = snap_to_edges(
+            graph, node_coords, facility_xy, kd_tree=kd_tree
+        )
+    else:
+        _, facility_nodes = kd_tree.query(facility_xy)
+
+    # Build geometries in the metric CRS so buffer distances are in metres
+    out_crs = road_crs
+    if metric_crs is not None:
+        transformer = Transformer.from_crs(road_crs, metric_crs, always_xy=True)
+        xs, ys = transformer.transform(node_coords[:, 0], node_coords[:, 1])
+        node_coords = np.column_stack((xs, ys))
+        out_crs = CRS.from_user_input(metric_crs)
+
+    rows = []
+    try:
+        for facility, threshold, lines, polygon in service_areas(
+            graph,
+            node_coords,
+            facility_nodes,
+            threshold_values,
+            per_facility=str(per_facility).lower() == "true",
+            workers=workers,
+            method=polygon_method,
+            buffer_distance=float(buffer_distance),
+            concave_ratio=float(concave_ratio),
+        ):
+            if polygon is None:
+                continue
+            rows.append((facility, threshold, lines, polygon))
+    except Exception as e:
+        raise RuntimeError(f"[ERROR] Service area computation failed: {e}")
+
+    if not rows:
+        raise ValueError("[ERROR] No road network is reachable from the facilities.")
+    # Facilities come back grouped by graph node; restore the input order
+    rows.sort(key=lambda row: (-1 if row[0] is None else row[0], row[1]))
+    facility_col, threshold_col, lines_col, polygon_col = zip(*rows)
+    facility_col = [None if f is None else facility_ids[f] for f in facility_col]
+    areas_gdf = gpd.GeoDataFrame(
+        {"facility_id": facility_col, "threshold": threshold_col},
+        geometry=list(polygon_col),
+        crs=out_crs,
+    )
+    print(f"Computed {len(areas_gdf)} service areas")
+
+    if store_artifact:
+        # Name the artifact here so the edges companion always has a base name
+        file_path = file_path or f"{uuid.uuid4()}.geojson"
+        save_feature(
+            store_artifact=store_artifact,
+            gdf=areas_gdf,
+            file_path=file_path,
+            config_path=config,
+        )
+        if str(include_edges).lower() == "true":
+            edges_gdf = areas_gdf.drop(columns="geometry").set_geometry(
+                gpd.GeoSeries(list(lines_col), crs=out_crs)
+            )
+            save_feature(
+                store_artifact=store_artifact,
+                gdf=edges_gdf,
+                file_path=companion_path(file_path, "_edges"),
+                config_path=config,
+            )
+    return file_path
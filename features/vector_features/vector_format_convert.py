@@ -15,6 +15,7 @@ DRIVER_MAPPING = {
     ".shp": "ESRI Shapefile",
     ".gpkg": "GPKG",
     ".kml": "KML",
+    ".fgb": "FlatGeobuf",
 }
 
 
@@ -2,9 +2,51 @@ import geopandas as gpd
 from common.minio_ops import connect_minio, get_bucket_name
 from common.save_feature_artifact import save_feature
 import io
+import numpy as np
+import pandas as pd
+import shapely
+from scipy.spatial import KDTree
 from shapely.geometry import box
 
 
+def attribute_text(df) -> pd.DataFrame:
+    """Every attribute as a string, the form cells carry whether or not shared."""
+    return df.astype(str).fillna("nan").astype(object)
+
+
+def concat_attributes(df, codes):
+    """Join the string values of each column per group code with ", "."""
+    return attribute_text(df).groupby(codes).agg(", ".join).to_numpy()
+
+
+def cells_with_attributes(cells, points_gdf) -> gpd.GeoDataFrame:
+    """
+    Attach to each Voronoi cell the attributes of its generating point. Cells
+    are convex, so a cell's centroid is closer to its generator than to any
+    other point and one KD-tree query finds every owner; attributes then
+    follow with a take. Attributes are stored as strings, and points sharing
+    a location share a cell and have their attributes concatenated.
+    """
+    cells = np.asarray(cells)
+    xy = shapely.get_coordinates(points_gdf.geometry.values)
+    _, owner = KDTree(xy).query(shapely.get_coordinates(shapely.centroid(cells)))
+    point_attributes = pd.DataFrame(points_gdf.drop(columns="geometry"))
+    attributes = attribute_text(point_attributes.iloc[owner].reset_index(drop=True))
+
+    # Duplicate points are the only reason for fewer cells than points
+    if len(cells) < len(xy) and attributes.columns.size:
+        _, location = np.unique(xy[:, 0] + 1j * xy[:, 1], return_inverse=True)
+        location = location.ravel()
+        shared = np.bincount(location)[location] > 1
+        codes, groups = pd.factorize(location[shared])
+        values = concat_attributes(point_attributes[shared], codes)
+        group_of = np.full(location.max() + 1, -1)
+        group_of[groups] = np.arange(len(groups))
+        cell_shared = shared[owner]
+        attributes.loc[cell_shared] = values[group_of[location[owner[cell_shared]]]]
+    return gpd.GeoDataFrame(attributes, geometry=cells, crs=points_gdf.crs)
+
+
 def create_voronoi_diagram(
     config: str,
     input_artifact_url: str,
@@ -47,24 +89,35 @@ def create_voronoi_diagram(
             tolerance=tolerance, extend_to=extend_to, only_edges=only_edges
         )
 
-        # Create a GeoDataFrame for the Voronoi polygons
-        voronoi_gdf = gpd.GeoDataFrame(geometry=voronoi_polygons, crs=points_gdf.crs)
-
-        # Perform spatial join to add point attributes to the polygons
-        joined_gdf = gpd.sjoin(
-            voronoi_gdf, points_gdf, how="left", predicate="intersects"
-        )
-
-        # Group by the geometry of the Voronoi polygons and concatenate point attributes
-        for col in points_gdf.columns:
-            if col != "geometry":  # Avoid processing geometry column
-                # Group by the geometry of Voronoi polygons and concatenate point attribute values
-                joined_gdf[col] = joined_gdf.groupby("geometry")[col].transform(
-                    lambda x: ", ".join(x.astype(str))
-                )
-
-        # save the dataframe to temporary pickle file
-        joined_gdf.to_pickle("temp.pkl")
+        if not only_edges and not tolerance:
+            # Each cell's generating point is known: map cells to points directly
+            joined_gdf = cells_with_attributes(voronoi_polygons, points_gdf)
+        else:
+            # Edges hold no points and snapping merges cells, so match them
+            # to the points with a spatial join instead
+            voronoi_gdf = gpd.GeoDataFrame(
+                geometry=voronoi_polygons, crs=points_gdf.crs
+            )
+            joined = gpd.sjoin(
+                voronoi_gdf, points_gdf, how="left", predicate="intersects"
+            )
+
+            # Concatenate the attributes of all points joined to each Voronoi
+            # polygon, grouping on the polygon's integer index (kept by sjoin)
+            # in one pass over all columns, into one row per polygon with the
+            # same columns as the direct mapping above
+            cols = [col for col in points_gdf.columns if col != "geometry"]
+            # Points are joined in their input order, as in the direct mapping
+            joined = joined.iloc[np.lexsort((joined["index_right"], joined.index))]
+            codes, cells = pd.factorize(joined.index)
+            attributes = pd.DataFrame(
+                concat_attributes(joined[cols], codes), columns=cols, dtype=object
+            )
+            joined_gdf = gpd.GeoDataFrame(
+                attributes,
+                geometry=voronoi_gdf.geometry.loc[cells].values,
+                crs=points_gdf.crs,
+            )
 
     except Exception as e:
         raise e
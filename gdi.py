@@ -20,6 +20,9 @@ cli.add_command(gdi_cli.compute_geometry)
 cli.add_command(gdi_cli.reduce_to_raster)
 cli.add_command(gdi_cli.get_raster_data)
 cli.add_command(gdi_cli.create_optimal_route)
+cli.add_command(gdi_cli.build_routing_graph)
+cli.add_command(gdi_cli.create_od_matrix)
+cli.add_command(gdi_cli.create_service_area)
 cli.add_command(gdi_cli.create_voronoi)
 cli.add_command(gdi_cli.clip_vector)
 cli.add_command(gdi_cli.create_delaunay_triangles)
@@ -28,6 +31,7 @@ cli.add_command(gdi_cli.generate_isometric_lines)
 cli.add_command(gdi_cli.generate_slope)
 cli.add_command(gdi_cli.generate_aspect)
 cli.add_command(gdi_cli.generate_hillshade)
+cli.add_command(gdi_cli.generate_terrain)
 cli.add_command(gdi_cli.generate_ndvi)
 cli.add_command(gdi_cli.raster_clip)
 cli.add_command(gdi_cli.rasters_merge)
@@ -35,6 +39,7 @@ cli.add_command(gdi_cli.download_raster)
 cli.add_command(gdi_cli.bbox_raster_clip)
 cli.add_command(gdi_cli.bbox_feature_clip)
 cli.add_command(gdi_cli.generate_local_correlation)
+cli.add_command(gdi_cli.generate_focal_statistics)
 cli.add_command(gdi_cli.reduce_to_feature)
 cli.add_command(gdi_cli.extract_band_path)
 cli.add_command(gdi_cli.convert_vector)
@@ -10,6 +10,9 @@ from features.vector_features.gcode import list_features
 from features.vector_features.compute_geo import compute_geometry_measures
 from features.vector_features.ReduceToImage import reduce_to_image
 from features.vector_features.optimalRoute import compute_optimal_route
+from features.vector_features.routing_graph import build_routing_graph as build_graph
+from features.vector_features.od_matrix import compute_od_matrix
+from features.vector_features.service_area import compute_service_area
 from features.vector_features.voronoi_diagram import create_voronoi_diagram
 from features.vector_features.clip_data import make_clip
 from features.vector_features.delaunay_triangles import make_delaunay_triangles
@@ -30,11 +33,13 @@ from features.raster_features.merge_rasters import merge_rasters
 from features.raster_features.download_raster import download_rasters_artifact
 from features.raster_features.bbox_clip_raster import bbox_clip_raster
 from features.raster_features.local_correlation import compute_local_correlation_5x5
+from features.raster_features.focal_statistics import compute_focal_statistics
 from features.raster_features.reduce_to_feature import extract_raster_to_vector
 from features.raster_features.band_extraction import band_extraction
 from features.raster_features.raster_format_convert import convert_raster_format
 from features.raster_features.compute_aspect import compute_aspect
 from features.raster_features.compute_hillshade import compute_hillshade
+from features.raster_features.terrain import compute_terrain
 from features.raster_features.canny_edge import compute_canny_edge
 from features.raster_features.hough_transform import get_hough_transform
 from features.raster_features.get_datetime import get_datetime
@@ -184,12 +189,36 @@ def create_buffer(config_path, artifact_url, buffer_d, store_artifact, file_path
     help="Store the intersected artifact.Set it to local/minio.",
 )
 @click.option("--file-path", help="Path to save the intersected artifact.")
+@click.option(
+    "--partitions",
+    type=int,
+    default=1,
+    help="Split the left layer into this many partitions intersected in parallel.",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Worker processes (defaults to all CPU cores).",
+)
 def create_intersection(
-    config_path, left_feature, right_feature, store_artifact, file_path
+    config_path,
+    left_feature,
+    right_feature,
+    store_artifact,
+    file_path,
+    partitions,
+    workers,
 ):
     """Intersect the artifacts."""
     make_intersection(
-        config_path, left_feature, right_feature, store_artifact, file_path
+        config_path,
+        left_feature,
+        right_feature,
+        store_artifact,
+        file_path,
+        partitions,
+        workers,
     )
 
 
@@ -216,11 +245,39 @@ def list_data(location):
     help="Store the compute geomtery artifact. Set it to local/minio.",
 )
 @click.option("--file-path", help="Path to save the compute geomtery artifact.")
-def compute_geometry(config_path, artifact_url, store_artifact, file_path):
+@click.option(
+    "--mode",
+    default="planar",
+    type=click.Choice(["planar", "geodesic"]),
+    help="Planar measures in EPSG:7755 or geodesic measures on the WGS84 ellipsoid.",
+)
+@click.option(
+    "--extra-measures",
+    type=bool,
+    default=False,
+    help="If set to True, also compute centroid, bbox, vertex count, compactness and convex hull ratio.",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=1,
+    help="Worker processes measuring chunks of features (0 uses all CPU cores).",
+)
+def compute_geometry(
+    config_path, artifact_url, store_artifact, file_path, mode, extra_measures, workers
+):
     """
     Reads geospatial data from MinIO, computes geometry measures, and optionally saves the processed data back to MinIO.
     """
-    compute_geometry_measures(config_path, artifact_url, store_artifact, file_path)
+    compute_geometry_measures(
+        config_path,
+        artifact_url,
+        store_artifact,
+        file_path,
+        mode,
+        extra_measures,
+        workers,
+    )
 
 
 @click.command()
@@ -285,18 +342,319 @@ def reduce_to_raster(
     help="Store final route & points. Set it to local/minio.",
 )
 @click.option("--file-path", help="MinIO object name to store final route (GeoJSON).")
+@click.option(
+    "--metric-crs",
+    default=None,
+    help="Projected CRS used to measure road lengths, e.g. EPSG:7755.",
+)
+@click.option(
+    "--mode",
+    type=click.Choice(["cycle", "open"]),
+    default="cycle",
+    help="cycle returns to the start point, open ends at the last stop.",
+)
+@click.option(
+    "--start-index", type=int, default=None, help="Row of the point to start from."
+)
+@click.option(
+    "--end-index",
+    type=int,
+    default=None,
+    help="Row of the point to finish at (open mode only).",
+)
+@click.option(
+    "--time-budget",
+    type=float,
+    default=10.0,
+    help="Seconds spent improving the visiting order.",
+)
+@click.option(
+    "--snap-to",
+    type=click.Choice(["node", "edge"]),
+    default="node",
+    help="Snap points to the nearest road vertex or onto the nearest road edge.",
+)
+@click.option(
+    "--decimals",
+    type=int,
+    default=None,
+    help="Round road vertex coordinates to this many decimals (match build-routing-graph).",
+)
 def create_optimal_route(
-    config_path, artifact_url, points_filepath, store_artifact, file_path
+    config_path,
+    artifact_url,
+    points_filepath,
+    store_artifact,
+    file_path,
+    metric_crs,
+    mode,
+    start_index,
+    end_index,
+    time_budget,
+    snap_to,
+    decimals,
 ):
     """
     Compute a TSP-based optimal route by:
       - downloading a pickled road network from MinIO,
       - reading points from local disk,
-      - building & solving TSP,
+      - ordering the stops with 2-opt / Or-opt within a time budget,
       - optionally storing route & points back to MinIO.
     """
     compute_optimal_route(
-        config_path, artifact_url, points_filepath, store_artifact, file_path
+        config_path,
+        artifact_url,
+        points_filepath,
+        store_artifact,
+        file_path,
+        metric_crs,
+        mode,
+        start_index,
+        end_index,
+        time_budget,
+        snap_to,
+        decimals,
+    )
+
+
+@click.command(name="build-routing-graph")
+@click.option(
+    "--config-path",
+    required=False,
+    default="./config.json",
+    help="Path to MinIO config file.",
+)
+@click.option(
+    "--artifact-url", required=True, help="URL to road network object name in MinIO."
+)
+@click.option(
+    "--metric-crs",
+    default=None,
+    help="Projected CRS used to measure road lengths, e.g. EPSG:7755.",
+)
+@click.option(
+    "--decimals",
+    type=int,
+    default=None,
+    help="Round vertex coordinates to this many decimals before joining them.",
+)
+def build_routing_graph(config_path, artifact_url, metric_crs, decimals):
+    """
+    Prebuild the routing graph of a road network and cache it in MinIO.
+    """
+    build_graph(config_path, artifact_url, metric_crs, decimals)
+
+
+@click.command(name="create-od-matrix")
+@click.option(
+    "--config-path",
+    required=False,
+    default="./config.json",
+    help="Path to MinIO config file.",
+)
+@click.option(
+    "--artifact-url", required=True, help="URL to road network object name in MinIO."
+)
+@click.option(
+    "--origins-artifact-url", required=True, help="MinIO object name of the origins."
+)
+@click.option(
+    "--destinations-artifact-url",
+    required=True,
+    help="MinIO object name of the destinations.",
+)
+@click.option(
+    "--store-artifact",
+    default="minio",
+    help="Store the OD matrix CSV. Set it to local/minio.",
+)
+@click.option("--file-path", help="Object name / local path of the output CSV.")
+@click.option(
+    "--metric-crs",
+    default=None,
+    help="Projected CRS used to measure road lengths, e.g. EPSG:7755.",
+)
+@click.option(
+    "--cutoff",
+    type=float,
+    default=None,
+    help="Only keep destinations within this network distance.",
+)
+@click.option("--origin-id-field", default=None, help="Field holding origin ids.")
+@click.option(
+    "--destination-id-field", default=None, help="Field holding destination ids."
+)
+@click.option(
+    "--snap-to",
+    type=click.Choice(["node", "edge"]),
+    default="node",
+    help="Snap points to the nearest road vertex or onto the nearest road edge.",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Worker processes (defaults to all CPU cores).",
+)
+@click.option(
+    "--decimals",
+    type=int,
+    default=None,
+    help="Round road vertex coordinates to this many decimals (match build-routing-graph).",
+)
+def create_od_matrix(
+    config_path,
+    artifact_url,
+    origins_artifact_url,
+    destinations_artifact_url,
+    store_artifact,
+    file_path,
+    metric_crs,
+    cutoff,
+    origin_id_field,
+    destination_id_field,
+    snap_to,
+    workers,
+    decimals,
+):
+    """
+    Compute a long-format origin-destination distance matrix on a road network.
+    """
+    compute_od_matrix(
+        config_path,
+        artifact_url,
+        origins_artifact_url,
+        destinations_artifact_url,
+        store_artifact,
+        file_path,
+        metric_crs,
+        cutoff,
+        origin_id_field,
+        destination_id_field,
+        snap_to,
+        workers,
+        decimals,
+    )
+
+
+@click.command(name="create-service-area")
+@click.option(
+    "--config-path",
+    required=False,
+    default="./config.json",
+    help="Path to MinIO config file.",
+)
+@click.option(
+    "--artifact-url", required=True, help="URL to road network object name in MinIO."
+)
+@click.option(
+    "--facilities-artifact-url",
+    required=True,
+    help="MinIO object name of the facility points.",
+)
+@click.option(
+    "--thresholds",
+    required=True,
+    help="Comma separated network distances, e.g. 500,1000,2000.",
+)
+@click.option(
+    "--store-artifact",
+    default="minio",
+    help="Store the service areas. Set it to local/minio.",
+)
+@click.option("--file-path", help="Object name / local path of the output GeoJSON.")
+@click.option(
+    "--metric-crs",
+    default=None,
+    help="Projected CRS used to measure road lengths, e.g. EPSG:7755.",
+)
+@click.option(
+    "--polygon-method",
+    type=click.Choice(["buffer", "concave_hull"]),
+    default="buffer",
+    help="Turn reachable roads into polygons by buffering or a concave hull.",
+)
+@click.option(
+    "--buffer-distance",
+    type=float,
+    default=50.0,
+    help="Buffer distance around reachable roads (buffer method).",
+)
+@click.option(
+    "--concave-ratio",
+    type=float,
+    default=0.3,
+    help="Concave hull ratio between 0 and 1 (concave_hull method).",
+)
+@click.option(
+    "--per-facility",
+    type=bool,
+    default=True,
+    help="If set to False, the areas of all facilities are merged.",
+)
+@click.option("--facility-id-field", default=None, help="Field holding facility ids.")
+@click.option(
+    "--include-edges",
+    type=bool,
+    default=True,
+    help="Also save the reachable road pieces as <file-path>_edges.geojson.",
+)
+@click.option(
+    "--snap-to",
+    type=click.Choice(["node", "edge"]),
+    default="node",
+    help="Snap points to the nearest road vertex or onto the nearest road edge.",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Worker processes (defaults to all CPU cores).",
+)
+@click.option(
+    "--decimals",
+    type=int,
+    default=None,
+    help="Round road vertex coordinates to this many decimals (match build-routing-graph).",
+)
+def create_service_area(
+    config_path,
+    artifact_url,
+    facilities_artifact_url,
+    thresholds,
+    store_artifact,
+    file_path,
+    metric_crs,
+    polygon_method,
+    buffer_distance,
+    concave_ratio,
+    per_facility,
+    facility_id_field,
+    include_edges,
+    snap_to,
+    workers,
+    decimals,
+):
+    """
+    Compute service areas (isochrones) around facilities on a road network.
+    """
+    compute_service_area(
+        config_path,
+        artifact_url,
+        facilities_artifact_url,
+        thresholds,
+        store_artifact,
+        file_path,
+        metric_crs,
+        polygon_method,
+        buffer_distance,
+        concave_ratio,
+        per_facility,
+        facility_id_field,
+        include_edges,
+        snap_to,
+        workers,
+        decimals,
     )
 
 
@@ -373,12 +731,19 @@ def create_voronoi(
     help="Store the clipped artifact. Set it to local/minio",
 )
 @click.option("--file-path", default="None", help="Path to save the clipped artifact")
+@click.option(
+    "--workers",
+    type=int,
+    default=1,
+    help="Worker processes intersecting boundary features (0 uses all CPU cores).",
+)
 def clip_vector(
     config_path,
     target_artifact_url,
     clip_artifact_url,
     store_artifact,
     file_path,
+    workers,
 ):
     """
     Clip a target feature to the extent of the clip feature,
@@ -389,6 +754,7 @@ def clip_vector(
         clip_artifact_url,
         store_artifact,
         file_path,
+        workers,
     )
 
 
@@ -445,12 +811,19 @@ def create_delaunay_triangles(
     help="Store the clipped artifact. Set it to local/minio",
 )
 @click.option("--file-path", default="None", help="Path to save the clipped artifact")
+@click.option(
+    "--workers",
+    type=int,
+    default=1,
+    help="Worker processes intersecting boundary features (0 uses all CPU cores).",
+)
 def bbox_feature_clip(
     config_path,
     target_artifact_url,
     clip_vector_path,
     store_artifact,
     file_path,
+    workers,
 ):
     """
     Clip a target feature to the extent bbox, input as a geojson from local path.
@@ -461,6 +834,7 @@ def bbox_feature_clip(
         clip_vector_path,
         store_artifact,
         file_path,
+        workers,
     )
 
 
@@ -560,10 +934,66 @@ def simplify_geometry(
 @click.option(
     "--file-path", default=None, help="Output file path to save the clustered result."
 )
-def kmeans_clustering(config_path, artifact_url, store_artifact, n_clusters, file_path):
+@click.option(
+    "--method",
+    type=click.Choice(["kmeans", "minibatch_kmeans", "dbscan", "hdbscan"]),
+    default="kmeans",
+    show_default=True,
+    help="Clustering algorithm.",
+)
+@click.option(
+    "--batch-size",
+    default=4096,
+    show_default=True,
+    help="Mini-batch size for minibatch_kmeans.",
+)
+@click.option(
+    "--eps",
+    type=float,
+    default=None,
+    help="DBSCAN neighbourhood distance (metres for geographic data).",
+)
+@click.option(
+    "--min-samples",
+    default=5,
+    show_default=True,
+    help="Neighbours needed for a core point (dbscan/hdbscan).",
+)
+@click.option(
+    "--min-cluster-size",
+    default=5,
+    show_default=True,
+    help="Smallest cluster hdbscan keeps.",
+)
+@click.option(
+    "--metric-crs",
+    default=None,
+    help="Projected CRS to measure distances in, e.g. EPSG:7755.",
+)
+@click.option(
+    "--summary",
+    type=bool,
+    default=False,
+    help="If set to True, also save cluster hulls and statistics as <file-path>_clusters.geojson.",
+)
+def kmeans_clustering(
+    config_path,
+    artifact_url,
+    store_artifact,
+    n_clusters,
+    file_path,
+    method,
+    batch_size,
+    eps,
+    min_samples,
+    min_cluster_size,
+    metric_crs,
+    summary,
+):
     """
     Perform KMeans clustering on input vector datasets and an attribute denoting the cluster number each feature in input vector belong to.
     Input vectors are fetched from MinIO and output can be saved locally or uploaded back.
+    MiniBatchKMeans, DBSCAN and HDBSCAN are available through --method.
     """
     generate_clusters(
         config=config_path,
@@ -571,6 +1001,13 @@ def kmeans_clustering(config_path, artifact_url, store_artifact, n_clusters, fil
         store_artifact=store_artifact,
         n_clusters=n_clusters,
         file_path=file_path,
+        method=method,
+        batch_size=batch_size,
+        eps=eps,
+        min_samples=min_samples,
+        min_cluster_size=min_cluster_size,
+        metric_crs=metric_crs,
+        summary=summary,
     )
 
 
@@ -693,11 +1130,19 @@ def flood_fill_model(config_path, artifact_url, threshold, store_artifact, file_
     "--file-path",
     help="Path for for saving isometric lines generated. If not provided, a UUID name is used.",
 )
+@click.option(
+    "--polygons",
+    default=False,
+    type=bool,
+    help="Output filled contour bands (polygons with level_min/level_max) instead of lines.",
+)
 def generate_isometric_lines(
-    config_path, artifact_url, interval, store_artifact, file_path
+    config_path, artifact_url, interval, store_artifact, file_path, polygons
 ):
     """Create flood inundated raster based on input DEM and threshold value"""
-    isometric_lines(config_path, artifact_url, interval, store_artifact, file_path)
+    isometric_lines(
+        config_path, artifact_url, interval, store_artifact, file_path, polygons
+    )
 
 
 @click.command()
@@ -778,6 +1223,77 @@ def generate_hillshade(config_path, artifact_url, store_artifact, file_path):
     compute_hillshade(config_path, artifact_url, store_artifact, file_path)
 
 
+@click.command()
+@click.option(
+    "--config-path",
+    required=False,
+    default="./config.json",
+    help="Path to the config file.",
+)
+@click.option(
+    "--artifact-url",
+    required=True,
+    help="MinIO object name for the DEM GeoTIFF (or COG).",
+)
+@click.option(
+    "--products",
+    default="slope,aspect,hillshade",
+    show_default=True,
+    help="Comma separated products: slope, aspect, hillshade, "
+    "multidirectional_hillshade, profile_curvature, plan_curvature, tri, tpi.",
+)
+@click.option(
+    "--z-factor", default=1.0, type=float, help="Vertical exaggeration factor."
+)
+@click.option(
+    "--azimuth", default=315.0, type=float, help="Sun azimuth for hillshade (deg)."
+)
+@click.option(
+    "--altitude", default=45.0, type=float, help="Sun altitude for hillshade (deg)."
+)
+@click.option("--tile-size", default=1024, type=int, help="Block size in pixels.")
+@click.option(
+    "--workers",
+    default=None,
+    type=int,
+    help="Number of threads processing blocks in parallel. Defaults to all CPU cores.",
+)
+@click.option(
+    "--store-artifact",
+    default="minio",
+    help="Store generated terrain raster. Set it to local/minio",
+)
+@click.option(
+    "--file-path",
+    help="Path for saving terrain raster generated. If not provided, a UUID name is used.",
+)
+def generate_terrain(
+    config_path,
+    artifact_url,
+    products,
+    z_factor,
+    azimuth,
+    altitude,
+    tile_size,
+    workers,
+    store_artifact,
+    file_path,
+):
+    """Create a multi-band terrain raster (one band per product) from a DEM in one pass"""
+    compute_terrain(
+        config_path,
+        artifact_url,
+        store_artifact,
+        file_path,
+        products=products,
+        z_factor=z_factor,
+        azimuth=azimuth,
+        altitude=altitude,
+        tile_size=tile_size,
+        workers=workers,
+    )
+
+
 @click.command()
 @click.option(
     "--config-path",
@@ -939,14 +1455,124 @@ def bbox_raster_clip(config_path, raster_key, vector_path, store_artifact, file_
     "--file-path",
     help="Path for for saving correlation raster generated. If not provided, a UUID name is used.",
 )
+@click.option(
+    "--workers",
+    default=None,
+    type=int,
+    help="Number of threads processing chunks in parallel. Defaults to all CPU cores.",
+)
+@click.option(
+    "--report-timings",
+    default=False,
+    type=bool,
+    help="Print read/compute/write timings for every chunk.",
+)
 def generate_local_correlation(
-    config_path, x, y, chunk_size, store_artifact, file_path
+    config_path, x, y, chunk_size, store_artifact, file_path, workers, report_timings
 ):
     """
     Compute a 5x5 local correlation between two rasters, where the window size is fixed as 5.
     """
     compute_local_correlation_5x5(
-        config_path, x, y, chunk_size, store_artifact, file_path
+        config_path,
+        x,
+        y,
+        chunk_size,
+        store_artifact,
+        file_path,
+        workers=workers,
+        report_timings=report_timings,
+    )
+
+
+@click.command()
+@click.option(
+    "--config-path",
+    required=False,
+    default="./config.json",
+    help="Path to the config file.",
+)
+@click.option(
+    "--artifact-url", required=True, help="MinIO object name of the input raster."
+)
+@click.option(
+    "--statistic",
+    required=True,
+    type=click.Choice(
+        ["mean", "std", "sum", "count", "min", "max", "range", "majority"]
+    ),
+    help="Statistic computed over each moving window.",
+)
+@click.option(
+    "--kernel-shape",
+    default="square",
+    type=click.Choice(["square", "circle", "annulus"]),
+    help="Shape of the moving window.",
+)
+@click.option(
+    "--radius", default=1, type=int, help="Kernel radius in pixels (square = 2r+1)."
+)
+@click.option(
+    "--inner-radius",
+    default=0,
+    type=int,
+    help="Inner radius in pixels excluded from an annulus kernel.",
+)
+@click.option(
+    "--tile-size",
+    default=1024,
+    type=int,
+    help="Block size in pixels; bounds memory use together with --workers.",
+)
+@click.option(
+    "--workers",
+    default=None,
+    type=int,
+    help="Number of threads processing blocks in parallel. Defaults to all CPU cores.",
+)
+@click.option(
+    "--report-timings",
+    default=False,
+    type=bool,
+    help="Print read/compute/write timings for every block.",
+)
+@click.option(
+    "--store-artifact",
+    default="minio",
+    help="Store generated focal statistics raster. Set it to local/minio",
+)
+@click.option(
+    "--file-path",
+    help="Path for saving focal statistics raster. If not provided, a UUID name is used.",
+)
+def generate_focal_statistics(
+    config_path,
+    artifact_url,
+    statistic,
+    kernel_shape,
+    radius,
+    inner_radius,
+    tile_size,
+    workers,
+    report_timings,
+    store_artifact,
+    file_path,
+):
+    """
+    Compute moving-window statistics over a square, circle or annulus neighbourhood.
+    """
+    compute_focal_statistics(
+        config_path,
+        artifact_url,
+        statistic,
+        store_artifact,
+        file_path,
+        kernel_shape=kernel_shape,
+        radius=radius,
+        inner_radius=inner_radius,
+        tile_size=tile_size,
+        workers=workers,
+        report_timings=report_timings,
     )
 
 
@@ -968,8 +1594,7 @@ def generate_local_correlation(
 @click.option(
     "--reducer",
     required=True,
-    type=click.Choice(["mean", "min", "max", "count", "sum"]),
-    help="Reducer operation to apply.",
+    help="Comma separated reducers: mean, min, max, count, sum, std, median, majority, histogram or percentiles such as p90.",
 )
 @click.option(
     "--attribute",
@@ -986,6 +1611,25 @@ def generate_local_correlation(
     default=None,
     help="Optional path to save output file. If not provided, a UUID name is used.",
 )
+@click.option("--bands", default="1", help="Comma separated raster bands to reduce.")
+@click.option(
+    "--histogram-bins",
+    default=10,
+    type=int,
+    help="Number of bins for the histogram reducer.",
+)
+@click.option(
+    "--coverage-mode",
+    default="binary",
+    type=click.Choice(["binary", "fractional"]),
+    help="Pixel-centre (binary) or exact area-weighted (fractional) coverage.",
+)
+@click.option(
+    "--raster-extent-only",
+    type=bool,
+    default=False,
+    help="If set to True, only read and keep features within the raster extent.",
+)
 def reduce_to_feature(
     config_path,
     raster_artifact_url,
@@ -994,6 +1638,10 @@ def reduce_to_feature(
     attribute,
     store_artifact,
     file_path,
+    bands,
+    histogram_bins,
+    coverage_mode,
+    raster_extent_only,
 ):
     """
     Extract raster values into vector features using spatial join with a specified reducer.
@@ -1006,6 +1654,10 @@ def reduce_to_feature(
         attribute,
         store_artifact,
         file_path,
+        bands,
+        histogram_bins,
+        coverage_mode,
+        raster_extent_only,
     )
 
 